@@ -137,9 +137,36 @@ class App extends Component {
     });
   }
 
+  async getBootstrap(){
+    let data;
+    try {
+      let response = await fetch('/api/bootstrap/', {
+        headers: {
+          'Accept': 'application/json',
+          'Content-Type': 'application/json',
+        }
+      });
+      if (response.ok){
+        data = await response.json();
+      }
+    } catch(error){
+      data = null;
+    }
+
+    if (!data){
+      this.getProducts();
+      this.getBanners();
+      return;
+    }
+
+    this.setState({
+      products : data.products,
+      banners : data.banners,
+    });
+  }
+
   componentDidMount(){
-    this.getProducts();
-    this.getBanners();
+    this.getBootstrap();
   }
 
 
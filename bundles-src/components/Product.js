@@ -1,6 +1,11 @@
 import React, {Component} from 'react';
 import Counter from './Counter';
 
+function getSrcSet(variants, format){
+  let srcSet = Object.keys(variants).map(width => `${variants[width][format]} ${width}w`);
+  return srcSet.length ? srcSet.join(', ') : undefined;
+}
+
 class Product extends Component{
   state = {
     isAdded: false,
@@ -39,13 +44,17 @@ class Product extends Component{
 
   render(){
     let image = this.props.product.image;
+    let variants = this.props.product.image_variants || {};
     let name = this.props.product.name;
     let price = this.props.product.price;
     let id = this.props.product.id;
     return (
       <div className="product">
         <div className="product-image">
-          <img src={image} alt={name} onClick={this.quickView.bind(this)}/>
+          <picture>
+            <source type="image/webp" srcSet={getSrcSet(variants, 'webp')} sizes="200px"/>
+            <img src={image} srcSet={getSrcSet(variants, 'jpeg')} sizes="200px" alt={name} onClick={this.quickView.bind(this)}/>
+          </picture>
         </div>
         <h4 className="product-name">{name}</h4>
         <p className="product-price currency">{price}</p>
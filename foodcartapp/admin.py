@@ -1,18 +1,41 @@
+from urllib.parse import urlsplit, urlunsplit
+
 from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.forms import ModelForm
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, QueryDict
 from django.shortcuts import reverse
 from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
-from .models import (Order, OrderItem, Product, ProductCategory, Restaurant,
-                     RestaurantMenuItem)
-from places.models import Place
+from .assignment import assign_restaurants
+from .candidates import invalidate_candidates
+from .models import (Banner, Order, OrderItem, Product, ProductCategory,
+                     Restaurant, RestaurantMenuItem)
+from .pagination import EstimatedCountPaginator, PaginatedInlineFormSet
+from places.models import GeocodingTask, Place
+
+
+class PaginatedInlinesModelAdmin(admin.ModelAdmin):
+    def response_change(self, request, obj):
+        response = super().response_change(request, obj)
+        page_params = {
+            param: value for param, value in request.GET.items()
+            if param.endswith('-page')
+        }
+        if '_continue' not in request.POST or not page_params:
+            return response
 
+        url = urlsplit(response['Location'])
+        query = QueryDict(url.query, mutable=True)
+        query.update(page_params)
+        response['Location'] = urlunsplit(url._replace(query=query.urlencode()))
+        return response
 
-class OrderModelAdmin(admin.ModelAdmin):
+
+class OrderModelAdmin(PaginatedInlinesModelAdmin):
     form = ModelForm
 
     def response_change(self, request, obj):
@@ -24,13 +47,64 @@ class OrderModelAdmin(admin.ModelAdmin):
         return super().response_change(request, obj)
 
 
-class RestaurantMenuItemInline(admin.TabularInline):
-    model = RestaurantMenuItem
+class CachedAutocompleteSelect(AutocompleteSelect):
+    cached_objects = None
+
+    def optgroups(self, name, value, attr=None):
+        selected_values = [
+            str(selected) for selected in value
+            if str(selected) not in self.choices.field.empty_values
+        ]
+        if self.cached_objects is None or not set(selected_values) <= self.cached_objects.keys():
+            return super().optgroups(name, value, attr)
+
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for selected_value in selected_values[:1]:
+            label = self.choices.field.label_from_instance(self.cached_objects[selected_value])
+            options.append(self.create_option(name, selected_value, label, True, len(options)))
+        return [(None, options, 0)]
+
+
+class PaginatedTabularInline(admin.TabularInline):
+    formset = PaginatedInlineFormSet
+    template = 'admin/foodcartapp/paginated_tabular.html'
     extra = 0
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            kwargs['widget'] = CachedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        page_param = f'{formset.get_default_prefix()}-page'
+        return type(formset.__name__, (formset,), {
+            'page_number': request.GET.get(page_param, 1),
+            'page_param': page_param,
+            'related_fields': self.autocomplete_fields,
+        })
+
+
+class RestaurantMenuItemInline(PaginatedTabularInline):
+    model = RestaurantMenuItem
+    autocomplete_fields = [
+        'product',
+    ]
+
+
+class ProductMenuItemInline(PaginatedTabularInline):
+    model = RestaurantMenuItem
+    autocomplete_fields = [
+        'restaurant',
+    ]
+
 
 @admin.register(Restaurant)
-class RestaurantAdmin(admin.ModelAdmin):
+class RestaurantAdmin(PaginatedInlinesModelAdmin):
     search_fields = [
         'name',
         'address',
@@ -40,6 +114,7 @@ class RestaurantAdmin(admin.ModelAdmin):
         'name',
         'address',
         'contact_phone',
+        'capacity',
     ]
     inlines = [
         RestaurantMenuItemInline
@@ -47,18 +122,20 @@ class RestaurantAdmin(admin.ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(PaginatedInlinesModelAdmin):
     list_display = [
         'get_image_list_preview',
         'name',
         'category',
         'price',
+        'is_available',
     ]
     list_display_links = [
         'name',
     ]
     list_filter = [
         'category',
+        'is_available',
     ]
     search_fields = [
         # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
@@ -68,7 +145,7 @@ class ProductAdmin(admin.ModelAdmin):
     ]
 
     inlines = [
-        RestaurantMenuItemInline
+        ProductMenuItemInline
     ]
     fieldsets = (
         ('Общее', {
@@ -98,21 +175,49 @@ class ProductAdmin(admin.ModelAdmin):
     class Media:
         css = {
             "all": (
-                static("admin/foodcartapp.css")
+                static("admin/foodcartapp.css"),
             )
         }
 
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.get_image_variant_url(400))
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.get_image_variant_url(100))
+    get_image_list_preview.short_description = 'превью'
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'position',
+        'is_active',
+        'starts_at',
+        'ends_at',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'position',
+        'is_active',
+    ]
+    list_filter = [
+        'is_active',
+    ]
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image.url)
     get_image_list_preview.short_description = 'превью'
 
 
@@ -121,22 +226,112 @@ class ProductAdmin(admin.ModelAdmin):
     pass
 
 
-class OrderItemInline(admin.TabularInline):
+class OrderItemInline(PaginatedTabularInline):
     model = OrderItem
-    extra = 0
+    autocomplete_fields = [
+        'product',
+    ]
 
 
 @admin.register(Order)
 class OrderAdmin(OrderModelAdmin):
+    list_display = [
+        'id',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+        'status',
+        'payment',
+        'total_price',
+        'restaurant',
+        'created_at',
+    ]
+    list_select_related = [
+        'restaurant',
+    ]
+    list_filter = [
+        'status',
+        'payment',
+    ]
+    date_hierarchy = 'created_at'
+    ordering = [
+        '-created_at',
+        '-id',
+    ]
     search_fields = [
-        'suname',
+        'firstname',
+        'lastname',
+        'phonenumber',
         'address',
     ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [
         OrderItemInline
     ]
+    actions = [
+        'assign_nearest_restaurants',
+        'mark_called',
+        'mark_delivered',
+        'mark_processed',
+    ]
+
+    def save_model(self, request, obj, form, change):
+        if 'address' in form.changed_data:
+            obj.locate()
+            obj.candidates_computed = False
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='Назначить рестораны автоматически')
+    def assign_nearest_restaurants(self, request, queryset):
+        assigned_count = assign_restaurants(queryset)
+        self.message_user(request, f'Назначено заказов: {assigned_count}')
+
+    @admin.action(description='Отметить, что клиенту позвонили')
+    def mark_called(self, request, queryset):
+        updated_count = queryset.mark_called()
+        self.message_user(request, f'Отмечено звонков: {updated_count}')
+
+    @admin.action(description='Отметить доставленными')
+    def mark_delivered(self, request, queryset):
+        updated_count = queryset.mark_delivered()
+        self.message_user(request, f'Отмечено доставленных заказов: {updated_count}')
+
+    @admin.action(description='Отметить обработанными')
+    def mark_processed(self, request, queryset):
+        updated_count = queryset.mark_processed()
+        self.message_user(request, f'Отмечено обработанных заказов: {updated_count}')
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_total_price()
+        if any(formset.has_changed() for formset in formsets):
+            invalidate_candidates(Order.objects.filter(pk=form.instance.pk))
 
 
 @admin.register(Place)
 class PlaceAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+    list_display = [
+        'address',
+        'lng',
+        'lat',
+        'updated_at',
+    ]
+    search_fields = [
+        'address',
+    ]
+    ordering = [
+        'address',
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(GeocodingTask)
+class GeocodingTaskAdmin(admin.ModelAdmin):
+    list_display = [
+        'address',
+        'attempts',
+        'created_at',
+    ]
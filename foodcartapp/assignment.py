@@ -0,0 +1,94 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from .availability import find_nearest_restaurants
+from .candidates import get_order_product_ids
+from .models import Order, Restaurant
+
+UNASSIGNED_COST = 1e9
+
+
+def solve_assignment(order_candidates, capacities):
+    demand = Counter(
+        restaurant for candidates in order_candidates for restaurant, _ in candidates
+    )
+    slots = []
+    restaurant_slots = {}
+    for restaurant, orders_count in demand.items():
+        slots_count = min(capacities[restaurant], orders_count)
+        restaurant_slots[restaurant] = range(len(slots), len(slots) + slots_count)
+        slots.extend([restaurant] * slots_count)
+
+    rows, columns, costs = [], [], []
+    for order_index, candidates in enumerate(order_candidates):
+        for restaurant, distance in candidates:
+            for slot in restaurant_slots[restaurant]:
+                rows.append(order_index)
+                columns.append(slot)
+                costs.append(distance + 1)
+        rows.append(order_index)
+        columns.append(len(slots) + order_index)
+        costs.append(UNASSIGNED_COST)
+
+    if not order_candidates:
+        return []
+    graph = csr_matrix(
+        (costs, (rows, columns)),
+        shape=(len(order_candidates), len(slots) + len(order_candidates)),
+    )
+    _, matched_slots = min_weight_full_bipartite_matching(graph)
+    return [
+        slots[slot] if slot < len(slots) else None
+        for slot in matched_slots
+    ]
+
+
+def get_free_capacities():
+    restaurants = Restaurant.objects.annotate(
+        active_orders=Count('orders', filter=Q(orders__status=Order.NOT_PROCESSED))
+    ).values_list('id', 'capacity', 'active_orders')
+    return {
+        restaurant_id: max(capacity - active_orders, 0)
+        for restaurant_id, capacity, active_orders in restaurants
+    }
+
+
+def assign_restaurants(orders, candidates_limit=20):
+    orders = list(
+        orders
+        .filter(
+            status=Order.NOT_PROCESSED,
+            restaurant__isnull=True,
+            geocoding_status=Order.GEOCODING_RESOLVED,
+            place__isnull=False,
+        )
+        .select_related('place')
+    )
+    order_product_ids = get_order_product_ids(orders)
+    order_candidates = [
+        find_nearest_restaurants(
+            order.place.lng,
+            order.place.lat,
+            order_product_ids[order.id],
+            limit=candidates_limit,
+            radius_km=settings.NEAREST_RESTAURANTS_RADIUS_KM,
+        )
+        for order in orders
+    ]
+
+    assigned_restaurants = solve_assignment(order_candidates, get_free_capacities())
+
+    assigned_orders = []
+    for order, restaurant_id in zip(orders, assigned_restaurants):
+        if restaurant_id is None:
+            continue
+        order.restaurant_id = restaurant_id
+        order.updated_at = timezone.now()
+        assigned_orders.append(order)
+    Order.objects.bulk_update(assigned_orders, ['restaurant', 'updated_at'], batch_size=500)
+    return len(assigned_orders)
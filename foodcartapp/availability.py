@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from places.spatial import GridIndex
+from .models import Restaurant, RestaurantMenuItem
+
+CACHE_KEY = 'foodcartapp:availability_index'
+GRID_CACHE_KEY = 'foodcartapp:restaurants_grid'
+CACHE_TIMEOUT = 60 * 60
+
+
+class RestaurantAvailabilityIndex:
+    def __init__(self, menu_items):
+        self.restaurant_ids = []
+        self.products = defaultdict(int)
+
+        positions = {}
+        for product_id, restaurant_id in menu_items:
+            if restaurant_id not in positions:
+                positions[restaurant_id] = len(self.restaurant_ids)
+                self.restaurant_ids.append(restaurant_id)
+            self.products[product_id] |= 1 << positions[restaurant_id]
+
+        self.products = dict(self.products)
+
+    @classmethod
+    def build(cls):
+        menu_items = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        return cls(menu_items)
+
+    def get_mask(self, product_ids):
+        if not product_ids:
+            return 0
+
+        mask = (1 << len(self.restaurant_ids)) - 1
+        for product_id in product_ids:
+            mask &= self.products.get(product_id, 0)
+        return mask
+
+    def get_matrix(self, product_ids, restaurant_ids):
+        positions = {
+            restaurant_id: position
+            for position, restaurant_id in enumerate(self.restaurant_ids)
+        }
+        restaurant_bits = [
+            1 << positions[restaurant_id] if restaurant_id in positions else 0
+            for restaurant_id in restaurant_ids
+        ]
+        return [
+            [bool(self.products.get(product_id, 0) & bit) for bit in restaurant_bits]
+            for product_id in product_ids
+        ]
+
+    def find_restaurants(self, product_ids):
+        mask = self.get_mask(product_ids)
+        restaurant_ids = []
+        while mask:
+            lowest_bit = mask & -mask
+            restaurant_ids.append(self.restaurant_ids[lowest_bit.bit_length() - 1])
+            mask ^= lowest_bit
+        return restaurant_ids
+
+
+def get_availability_index():
+    index = cache.get(CACHE_KEY)
+    if index is None:
+        index = RestaurantAvailabilityIndex.build()
+        cache.set(CACHE_KEY, index, CACHE_TIMEOUT)
+    return index
+
+
+def reset_availability_index():
+    cache.delete(CACHE_KEY)
+
+
+def build_restaurants_grid():
+    return GridIndex(
+        Restaurant.objects
+        .filter(place__isnull=False)
+        .values_list('id', 'place__lng', 'place__lat')
+    )
+
+
+def get_restaurants_grid():
+    grid = cache.get(GRID_CACHE_KEY)
+    if grid is None:
+        grid = build_restaurants_grid()
+        cache.set(GRID_CACHE_KEY, grid, CACHE_TIMEOUT)
+    return grid
+
+
+def reset_restaurants_grid():
+    cache.delete(GRID_CACHE_KEY)
+
+
+def find_nearest_restaurants(lng, lat, product_ids, limit=None, radius_km=None,
+                             index=None, grid=None):
+    if index is None:
+        index = get_availability_index()
+    if grid is None:
+        grid = get_restaurants_grid()
+
+    allowed_ids = set(index.find_restaurants(product_ids))
+    if not allowed_ids:
+        return []
+    return grid.find_nearest(
+        lng, lat, limit=limit, radius_km=radius_km, allowed_ids=allowed_ids
+    )
@@ -0,0 +1,81 @@
+import gzip
+import hashlib
+import json
+import re
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+BANNERS_CACHE_KEY = 'foodcartapp:banner_list'
+BOOTSTRAP_CACHE_KEY = 'foodcartapp:bootstrap'
+PRODUCTS_CACHE_KEY = 'foodcartapp:product_list'
+CACHE_TIMEOUT = 60 * 60
+GZIP_MIN_LENGTH = 1024
+ACCEPTS_GZIP_PATTERN = re.compile(r'\bgzip\b')
+
+
+def dump_json(data):
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def make_json_payload(data):
+    content = dump_json(data)
+    etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+    compressed_content = None
+    if len(content) >= GZIP_MIN_LENGTH:
+        compressed_content = gzip.compress(content, mtime=0)
+    return content, etag, compressed_content
+
+
+def cache_json(key, data, timeout=CACHE_TIMEOUT):
+    payload = make_json_payload(data)
+    cache.set(key, payload, timeout)
+    return payload
+
+
+def get_cached_json(key, build_data):
+    payload = cache.get(key)
+    if payload is None:
+        payload = cache_json(key, build_data())
+    return payload
+
+
+def reset_cached_json(*keys):
+    cache.delete_many(keys)
+
+
+def conditional_json_response(request, payload):
+    content, etag, compressed_content = payload
+
+    is_compressed = (
+        compressed_content is not None
+        and ACCEPTS_GZIP_PATTERN.search(request.headers.get('Accept-Encoding', ''))
+    )
+    if is_compressed:
+        content = compressed_content
+        etag = etag[:-1] + '-gzip"'
+
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/json')
+        if is_compressed:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    if compressed_content is not None:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def cached_json_response(request, key, build_data):
+    return conditional_json_response(request, get_cached_json(key, build_data))
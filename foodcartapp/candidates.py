@@ -0,0 +1,110 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from places.spatial import get_bounding_box
+from .availability import (RestaurantAvailabilityIndex, build_restaurants_grid,
+                           find_nearest_restaurants, reset_restaurants_grid)
+from .models import Order, OrderCandidate, OrderItem, Restaurant
+
+
+def get_order_product_ids(orders):
+    order_product_ids = defaultdict(list)
+    order_items = (
+        OrderItem.objects
+        .filter(order__in=orders)
+        .values_list('order_id', 'product_id')
+    )
+    for order_id, product_id in order_items:
+        order_product_ids[order_id].append(product_id)
+    return order_product_ids
+
+
+def find_candidates(order, product_ids, index=None, grid=None):
+    if order.geocoding_status != Order.GEOCODING_RESOLVED or not order.place:
+        return []
+
+    return find_nearest_restaurants(
+        order.place.lng,
+        order.place.lat,
+        product_ids,
+        limit=settings.NEAREST_RESTAURANTS_LIMIT,
+        radius_km=settings.NEAREST_RESTAURANTS_RADIUS_KM,
+        index=index,
+        grid=grid,
+    )
+
+
+@transaction.atomic
+def refresh_candidates(orders):
+    index = RestaurantAvailabilityIndex.build()
+    grid = build_restaurants_grid()
+    order_product_ids = get_order_product_ids(orders)
+    OrderCandidate.objects.filter(order__in=orders).delete()
+    OrderCandidate.objects.bulk_create([
+        OrderCandidate(order=order, restaurant_id=restaurant_id, distance=distance)
+        for order in orders
+        for restaurant_id, distance in find_candidates(
+            order, order_product_ids[order.id], index=index, grid=grid
+        )
+    ])
+    Order.objects.filter(id__in=[order.id for order in orders]).update(
+        candidates_computed=True,
+        updated_at=timezone.now()
+    )
+
+
+def refresh_stale_candidates(batch_size):
+    orders = list(
+        Order.objects
+        .filter(status=Order.NOT_PROCESSED, candidates_computed=False)
+        .exclude(geocoding_status=Order.GEOCODING_PENDING)
+        .select_related('place')
+        .order_by('created_at')[:batch_size]
+    )
+    if orders:
+        refresh_candidates(orders)
+    return len(orders)
+
+
+def invalidate_candidates(orders):
+    return (
+        orders
+        .filter(status=Order.NOT_PROCESSED, candidates_computed=True)
+        .update(candidates_computed=False, updated_at=timezone.now())
+    )
+
+
+def invalidate_product_candidates(product_id):
+    return invalidate_candidates(
+        Order.objects.filter(order_items__product_id=product_id)
+    )
+
+
+def invalidate_restaurant_candidates(restaurants):
+    affected_orders = Q(candidates__restaurant__in=restaurants)
+    for restaurant in restaurants:
+        if not restaurant.place:
+            continue
+        min_lng, min_lat, max_lng, max_lat = get_bounding_box(
+            restaurant.place.lng,
+            restaurant.place.lat,
+            settings.NEAREST_RESTAURANTS_RADIUS_KM,
+        )
+        affected_orders |= Q(
+            place__lng__range=(min_lng, max_lng),
+            place__lat__range=(min_lat, max_lat),
+        )
+    return invalidate_candidates(Order.objects.filter(affected_orders))
+
+
+def attach_restaurant_places(addresses):
+    if not Restaurant.objects.attach_places(addresses):
+        return
+    reset_restaurants_grid()
+    invalidate_restaurant_candidates(
+        list(Restaurant.objects.filter(address__in=addresses).select_related('place'))
+    )
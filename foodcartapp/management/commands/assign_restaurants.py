@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.assignment import assign_restaurants
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        'Назначает рестораны всем необработанным заказам так, чтобы суммарное '
+        'расстояние доставки было минимальным, с учётом загрузки ресторанов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--candidates',
+            type=int,
+            default=20,
+            help='Сколько ближайших ресторанов рассматривать для каждого заказа',
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        assigned_count = assign_restaurants(Order.objects.all(), options['candidates'])
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(f'Назначено заказов: {assigned_count} за {elapsed:.2f} с')
@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.assignment import solve_assignment
+from places.spatial import GridIndex
+
+DEFAULT_SCALES = ['100x20', '1000x100', '1000x300', '5000x500']
+
+
+class Command(BaseCommand):
+    help = 'Замеряет скорость автоматического назначения ресторанов на синтетических данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scales',
+            nargs='*',
+            default=DEFAULT_SCALES,
+            help='Размеры задач в виде ЗАКАЗЫxРЕСТОРАНЫ',
+        )
+        parser.add_argument('--candidates', type=int, default=20)
+        parser.add_argument('--radius', type=float, default=50)
+        parser.add_argument('--capacity', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        for scale in options['scales']:
+            orders_count, restaurants_count = map(int, scale.split('x'))
+            self.run_instance(orders_count, restaurants_count, options)
+
+    def run_instance(self, orders_count, restaurants_count, options):
+        randomizer = random.Random(options['seed'])
+        restaurants = [
+            (restaurant_id, randomizer.uniform(37.3, 37.9), randomizer.uniform(55.5, 56.0))
+            for restaurant_id in range(restaurants_count)
+        ]
+        capacities = {
+            restaurant_id: randomizer.randint(1, options['capacity'])
+            for restaurant_id, _, _ in restaurants
+        }
+        orders = [
+            (randomizer.uniform(37.3, 37.9), randomizer.uniform(55.5, 56.0))
+            for _ in range(orders_count)
+        ]
+        available_restaurants = [
+            set(randomizer.sample(range(restaurants_count), restaurants_count * 3 // 4))
+            for _ in range(orders_count)
+        ]
+
+        started_at = time.perf_counter()
+        grid = GridIndex(restaurants)
+        order_candidates = [
+            grid.find_nearest(
+                lng,
+                lat,
+                limit=options['candidates'],
+                radius_km=options['radius'],
+                allowed_ids=allowed_ids,
+            )
+            for (lng, lat), allowed_ids in zip(orders, available_restaurants)
+        ]
+        search_time = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        assigned_restaurants = solve_assignment(order_candidates, capacities)
+        solve_time = time.perf_counter() - started_at
+
+        distances = {
+            (order_index, restaurant_id): distance
+            for order_index, candidates in enumerate(order_candidates)
+            for restaurant_id, distance in candidates
+        }
+        assigned = [
+            distances[order_index, restaurant_id]
+            for order_index, restaurant_id in enumerate(assigned_restaurants)
+            if restaurant_id is not None
+        ]
+        self.stdout.write(
+            f'{orders_count} заказов x {restaurants_count} ресторанов: '
+            f'поиск кандидатов {search_time:.2f} с, решение {solve_time:.2f} с, '
+            f'назначено {len(assigned)} (мест {sum(capacities.values())}), '
+            f'суммарное расстояние {sum(assigned):.1f} км'
+        )
@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from foodcartapp.models import Order
+from places.models import Place
+
+ADDRESS_PREFIX = 'Синтетический адрес'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запрос координат заказов через подзапросы по адресу '
+        'и через внешний ключ на Place. Данные создаются во временной транзакции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50000)
+        parser.add_argument('--places', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_dataset(options['orders'], options['places'], options['seed'])
+
+            places = Place.objects.filter(address=OuterRef('address'))
+            querysets = [
+                ('Подзапросы по адресу', Order.objects.annotate(
+                    lng=Subquery(places.values('lng')),
+                    lat=Subquery(places.values('lat')),
+                ).values_list('id', 'lng', 'lat')),
+                ('Внешний ключ на Place', Order.objects.values_list(
+                    'id', 'place__lng', 'place__lat',
+                )),
+            ]
+            for title, queryset in querysets:
+                self.stdout.write(self.style.MIGRATE_HEADING(title))
+                self.stdout.write(queryset.explain())
+                started_at = time.perf_counter()
+                rows_count = len(list(queryset))
+                elapsed = time.perf_counter() - started_at
+                self.stdout.write(f'{rows_count} строк за {elapsed:.3f} с\n')
+
+            transaction.set_rollback(True)
+
+    def create_dataset(self, orders_count, places_count, seed):
+        randomizer = random.Random(seed)
+        Place.objects.bulk_create([
+            Place(
+                address=f'{ADDRESS_PREFIX} {number}',
+                lng=randomizer.uniform(37.3, 37.9),
+                lat=randomizer.uniform(55.5, 56.0),
+            )
+            for number in range(places_count)
+        ], batch_size=1000)
+        place_ids = dict(
+            Place.objects
+            .filter(address__startswith=ADDRESS_PREFIX)
+            .values_list('address', 'id')
+        )
+        addresses = list(place_ids)
+
+        orders = []
+        for _ in range(orders_count):
+            address = randomizer.choice(addresses)
+            orders.append(Order(
+                firstname='Покупатель',
+                phonenumber='+79001234567',
+                address=address,
+                place_id=place_ids[address],
+                geocoding_status=Order.GEOCODING_RESOLVED,
+            ))
+        Order.objects.bulk_create(orders, batch_size=1000)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок товаров, которых ещё нет или которые устарели'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии для всех товаров',
+        )
+
+    def handle(self, *args, **options):
+        updated_count = 0
+        products = Product.objects.exclude(image='').only('id', 'name', 'image', 'image_variants')
+        for product in products.iterator():
+            try:
+                is_updated = product.update_image_variants(force=options['force'])
+            except OSError as error:
+                self.stderr.write(f'Товар {product.id} «{product.name}»: {error}')
+                continue
+            if is_updated:
+                product.save(update_fields=['image_variants'])
+                updated_count += 1
+        self.stdout.write(f'Обновлено товаров: {updated_count}')
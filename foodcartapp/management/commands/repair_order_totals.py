@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохранённую стоимость заказов с суммой по позициям и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправлять',
+        )
+
+    def handle(self, *args, **options):
+        drifted_orders = list(
+            Order.objects
+            .with_computed_total_price()
+            .exclude(total_price=F('computed_total_price'))
+            .only('id', 'total_price', 'updated_at')
+        )
+        for order in drifted_orders:
+            self.stdout.write(
+                f'Заказ {order.id}: сохранено {order.total_price}, '
+                f'по позициям {order.computed_total_price}'
+            )
+            order.total_price = order.computed_total_price
+            order.updated_at = timezone.now()
+
+        if drifted_orders and not options['check']:
+            Order.objects.bulk_update(
+                drifted_orders, ['total_price', 'updated_at'], batch_size=500
+            )
+        self.stdout.write(f'Расхождений: {len(drifted_orders)}')
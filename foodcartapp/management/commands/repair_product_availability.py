@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from foodcartapp.caching import (BOOTSTRAP_CACHE_KEY, PRODUCTS_CACHE_KEY,
+                                 reset_cached_json)
+from foodcartapp.models import Product
+from foodcartapp.search import reset_product_search_index
+
+
+class Command(BaseCommand):
+    help = 'Сверяет флаг наличия товаров с меню ресторанов и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправлять',
+        )
+
+    def handle(self, *args, **options):
+        drifted_products = list(
+            Product.objects
+            .with_computed_availability()
+            .exclude(is_available=F('computed_is_available'))
+            .values_list('id', 'name', 'is_available')
+        )
+        for product_id, name, is_available in drifted_products:
+            self.stdout.write(
+                f'Товар {product_id} «{name}»: сохранено {is_available}, '
+                f'по меню {not is_available}'
+            )
+
+        if drifted_products and not options['check']:
+            Product.objects.filter(
+                pk__in=[product_id for product_id, *_ in drifted_products]
+            ).update_availability()
+            reset_cached_json(PRODUCTS_CACHE_KEY, BOOTSTRAP_CACHE_KEY)
+            reset_product_search_index()
+        self.stdout.write(f'Расхождений: {len(drifted_products)}')
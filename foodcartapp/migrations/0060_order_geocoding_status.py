@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_alter_order_restaurant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='geocoding_status',
+            field=models.CharField(choices=[('pending', 'Координаты уточняются'), ('resolved', 'Координаты найдены'), ('failed', 'Адрес не найден')], db_index=True, default='pending', max_length=8, verbose_name='Статус геокодирования'),
+        ),
+    ]
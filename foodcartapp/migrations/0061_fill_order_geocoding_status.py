@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def fill_geocoding_status(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    Place = apps.get_model('places', 'Place')
+    GeocodingTask = apps.get_model('places', 'GeocodingTask')
+
+    geocoded_addresses = Place.objects.values_list('address', flat=True)
+    Order.objects.filter(address__in=geocoded_addresses).update(geocoding_status='resolved')
+
+    pending_addresses = (
+        Order.objects
+        .filter(geocoding_status='pending')
+        .values_list('address', flat=True)
+        .distinct()
+    )
+    GeocodingTask.objects.bulk_create(
+        [GeocodingTask(address=address) for address in pending_addresses],
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_order_geocoding_status'),
+        ('places', '0007_geocodingtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_geocoding_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_places(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    Restaurant = apps.get_model('foodcartapp', 'Restaurant')
+    Place = apps.get_model('places', 'Place')
+
+    place_by_address = Subquery(
+        Place.objects.filter(address=OuterRef('address')).values('pk')[:1]
+    )
+    Order.objects.update(place=place_by_address)
+    Restaurant.objects.update(place=place_by_address)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0062_order_place_restaurant_place'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_places, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import migrations
+
+BANNERS = [
+    {
+        'title': 'Burger',
+        'image': 'burger.jpg',
+        'text': 'Tasty Burger at your door step',
+    },
+    {
+        'title': 'Spices',
+        'image': 'food.jpg',
+        'text': 'All Cuisines',
+    },
+    {
+        'title': 'New York',
+        'image': 'tasty.jpg',
+        'text': 'Food is incomplete without a tasty dessert',
+    },
+]
+
+
+def create_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+
+    storage = Banner._meta.get_field('image').storage
+
+    for position, banner_data in enumerate(BANNERS):
+        image_name = f'banners/{banner_data["image"]}'
+        if not storage.exists(image_name):
+            image_path = os.path.join(settings.BASE_DIR, 'assets', banner_data['image'])
+            with open(image_path, 'rb') as image_file:
+                image_name = storage.save(image_name, File(image_file))
+
+        Banner.objects.create(
+            title=banner_data['title'],
+            text=banner_data['text'],
+            image=image_name,
+            position=position,
+        )
+
+
+def delete_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+
+    Banner.objects.filter(title__in=[banner['title'] for banner in BANNERS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0071_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_banners, delete_banners),
+    ]
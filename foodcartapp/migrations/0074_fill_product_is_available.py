@@ -0,0 +1,21 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+def fill_is_available(apps, schema_editor):
+    Product = apps.get_model('foodcartapp', 'Product')
+    RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+
+    menu_items = RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)
+    Product.objects.update(is_available=Exists(menu_items))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0073_product_is_available'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_is_available, migrations.RunPython.noop),
+    ]
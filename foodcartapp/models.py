@@ -1,12 +1,34 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import DecimalField, F, Sum
+from django.db import models, transaction
+from django.db.models import DateTimeField, DecimalField, F, Sum, Value
 from django.db.models.deletion import SET_NULL
-from django.db.models.expressions import OuterRef, Subquery
+from django.db.models.expressions import Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
-from places.models import Place
+from places.cache import place_cache
+from places.models import GeocodingTask, Place
+from .thumbnails import delete_image_variants, make_image_variants
+
+
+def get_place_by_address():
+    places = Place.objects.filter(address=OuterRef('address'))
+    return Subquery(places.values('pk')[:1])
+
+
+def find_place(address):
+    place = place_cache.get(address, verify=True)
+    if not place or not place_cache.is_fresh(place):
+        with transaction.atomic():
+            GeocodingTask.objects.select_for_update().get_or_create(address=address)
+    return place
+
+
+class RestaurantQuerySet(models.QuerySet):
+    def attach_places(self, addresses):
+        return self.filter(address__in=addresses).update(place=get_place_by_address())
 
 
 class Restaurant(models.Model):
@@ -24,6 +46,21 @@ class Restaurant(models.Model):
         max_length=50,
         blank=True,
     )
+    capacity = models.PositiveSmallIntegerField(
+        'максимум заказов в работе',
+        default=10,
+    )
+    place = models.ForeignKey(
+        Place,
+        on_delete=models.SET_NULL,
+        related_name='restaurants',
+        verbose_name='координаты',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    objects = RestaurantQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'ресторан'
@@ -32,15 +69,36 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        restaurant = super().from_db(db, field_names, values)
+        restaurant._loaded_address = restaurant.__dict__.get('address')
+        return restaurant
+
+    def save(self, *args, **kwargs):
+        self.location_changed = self._state.adding or self.address != getattr(self, '_loaded_address', None)
+        if self.location_changed:
+            self.place = find_place(self.address) if self.address else None
+        super().save(*args, **kwargs)
+        self._loaded_address = self.address
+        self._loaded_address = self.address
+
+
+def has_available_menu_items():
+    return Exists(
+        RestaurantMenuItem.objects.filter(product=OuterRef('pk'), availability=True)
+    )
+
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
-        )
-        return self.filter(pk__in=products)
+        return self.filter(is_available=True)
+
+    def with_computed_availability(self):
+        return self.annotate(computed_is_available=has_available_menu_items())
+
+    def update_availability(self):
+        return self.update(is_available=has_available_menu_items())
 
 
 class ProductCategory(models.Model):
@@ -88,6 +146,17 @@ class Product(models.Model):
         'описание',
         blank=True,
     )
+    image_variants = models.JSONField(
+        'уменьшенные картинки',
+        default=dict,
+        editable=False,
+    )
+    is_available = models.BooleanField(
+        'есть в меню ресторанов',
+        default=False,
+        db_index=True,
+        editable=False,
+    )
 
     objects = ProductQuerySet.as_manager()
 
@@ -98,14 +167,82 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        product._loaded_image = product.__dict__.get('image')
+        return product
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        if fields is None or 'image' in fields:
+            self._loaded_image = self.image.name
+
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            self.image.save(self.image.name, self.image.file, save=False)
+        if self._state.adding or self.image.name != getattr(self, '_loaded_image', None):
+            try:
+                self.update_image_variants()
+            except OSError:
+                self.image_variants = {}
+
+        # is_available is kept up to date by menu item updates, do not overwrite it
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'is_available' and field.attname in self.__dict__
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_image = self.image.name
+
+    def update_image_variants(self, force=False):
+        if not force and self.image_variants.get('source') == (self.image.name or None):
+            return False
+
+        delete_image_variants(self.image.storage, self.image_variants)
+        self.image_variants = {}
+        if self.image:
+            self.image_variants = make_image_variants(self.image)
+        return True
+
+    def get_image_variant_url(self, width, extension='jpeg'):
+        variants = self.image_variants.get('widths', {}).get(str(width))
+        if not variants:
+            return self.image.url
+        return self.image.storage.url(variants[extension])
+
+
+menu_items_changed = Signal()
+
 
 class RestaurantMenuItemQuerySet(models.QuerySet):
-    def fetch_coordinates(self):
-        places = Place.objects.all()
-        return self.annotate(
-            lng=Subquery(places.filter(address=OuterRef('restaurant__address')).values('lng')),
-            lat=Subquery(places.filter(address=OuterRef('restaurant__address')).values('lat'))
+    def update(self, **kwargs):
+        product_ids = set(self.values_list('product_id', flat=True))
+        updated_count = super().update(**kwargs)
+        product = kwargs.get('product', kwargs.get('product_id'))
+        if product is not None:
+            product_ids.add(getattr(product, 'pk', product))
+        self.notify_changed(product_ids)
+        return updated_count
+
+    def bulk_create(self, objs, *args, **kwargs):
+        menu_items = super().bulk_create(objs, *args, **kwargs)
+        self.notify_changed({menu_item.product_id for menu_item in menu_items})
+        return menu_items
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        product_ids = set(
+            self.filter(pk__in=[menu_item.pk for menu_item in objs])
+            .values_list('product_id', flat=True)
         )
+        super().bulk_update(objs, fields, *args, **kwargs)
+        product_ids.update(menu_item.product_id for menu_item in objs)
+        self.notify_changed(product_ids)
+
+    def notify_changed(self, product_ids):
+        Product.objects.filter(pk__in=product_ids).update_availability()
+        menu_items_changed.send(sender=RestaurantMenuItem, product_ids=product_ids)
 
 
 class RestaurantMenuItem(models.Model):
@@ -141,20 +278,56 @@ class RestaurantMenuItem(models.Model):
 
 
 class OrderQuerySet(models.QuerySet):
-    def get_total_price(self):
+    def with_computed_total_price(self):
         return self.annotate(
-            total_price=Sum(
-                F('order_items__price') * F('order_items__quantity'),
+            computed_total_price=Coalesce(
+                Sum(
+                    F('order_items__price') * F('order_items__quantity'),
+                    output_field=DecimalField(max_digits=8, decimal_places=2)
+                ),
+                Value(0),
                 output_field=DecimalField(max_digits=8, decimal_places=2)
             )
         )
 
-    
-    def fetch_coordinates(self):
-        places = Place.objects.all()
-        return self.annotate(
-            lng=Subquery(places.filter(address=OuterRef('address')).values('lng')),
-            lat=Subquery(places.filter(address=OuterRef('address')).values('lat')),
+    def mark_geocoded(self, addresses_with_coords):
+        found_addresses = [
+            address for address, coordinates in addresses_with_coords.items() if coordinates
+        ]
+        missing_addresses = [
+            address for address, coordinates in addresses_with_coords.items() if not coordinates
+        ]
+        pending_orders = self.filter(geocoding_status=Order.GEOCODING_PENDING)
+        pending_orders.filter(address__in=found_addresses).update(
+            geocoding_status=Order.GEOCODING_RESOLVED,
+            place=get_place_by_address(),
+            updated_at=timezone.now()
+        )
+        pending_orders.filter(address__in=missing_addresses).update(
+            geocoding_status=Order.GEOCODING_FAILED,
+            updated_at=timezone.now()
+        )
+
+    def mark_called(self):
+        now = timezone.now()
+        return self.filter(called_at__isnull=True).update(
+            called_at=now,
+            updated_at=now
+        )
+
+    def mark_delivered(self):
+        now = timezone.now()
+        return self.update(
+            status=Order.PROCESSED,
+            called_at=Coalesce('called_at', Value(now, output_field=DateTimeField())),
+            delivered_at=Coalesce('delivered_at', Value(now, output_field=DateTimeField())),
+            updated_at=now
+        )
+
+    def mark_processed(self):
+        return self.update(
+            status=Order.PROCESSED,
+            updated_at=timezone.now()
         )
 
 
@@ -178,6 +351,16 @@ class Order(models.Model):
         (NOT_SELECTED, 'Не выбран')
     ]
 
+    GEOCODING_PENDING = 'pending'
+    GEOCODING_RESOLVED = 'resolved'
+    GEOCODING_FAILED = 'failed'
+
+    geocoding_statuses = [
+        (GEOCODING_PENDING, 'Координаты уточняются'),
+        (GEOCODING_RESOLVED, 'Координаты найдены'),
+        (GEOCODING_FAILED, 'Адрес не найден')
+    ]
+
     firstname = models.CharField(
         verbose_name='Имя',
         max_length=50
@@ -194,7 +377,29 @@ class Order(models.Model):
     address = models.CharField(
         'Адрес',
         max_length=100,
-    ) 
+    )
+    place = models.ForeignKey(
+        Place,
+        on_delete=models.SET_NULL,
+        related_name='orders',
+        verbose_name='Координаты',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    geocoding_status = models.CharField(
+        verbose_name='Статус геокодирования',
+        max_length=8,
+        choices=geocoding_statuses,
+        default=GEOCODING_PENDING,
+        db_index=True
+    )
+    candidates_computed = models.BooleanField(
+        verbose_name='Рестораны подобраны',
+        default=False,
+        db_index=True,
+        editable=False
+    )
     status = models.CharField(
         verbose_name='Статус',
         max_length=13,
@@ -213,6 +418,13 @@ class Order(models.Model):
         verbose_name='Комментарий',
         blank=True
     )
+    total_price = models.DecimalField(
+        verbose_name='Стоимость',
+        max_digits=8,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
     created_at = models.DateTimeField(
         verbose_name='Время создания заказа',
         default=timezone.now,
@@ -230,6 +442,10 @@ class Order(models.Model):
         blank=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Время изменения заказа',
+        auto_now=True
+    )
     
     restaurant = models.ForeignKey(
         Restaurant,
@@ -245,10 +461,31 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id']),
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.firstname} {self.lastname}"
 
+    def update_total_price(self):
+        self.total_price = (
+            Order.objects
+            .filter(pk=self.pk)
+            .with_computed_total_price()
+            .values_list('computed_total_price', flat=True)
+            .get()
+        )
+        self.save(update_fields=['total_price', 'updated_at'])
+
+    def locate(self):
+        self.place = find_place(self.address)
+        if self.place:
+            self.geocoding_status = Order.GEOCODING_RESOLVED
+        else:
+            self.geocoding_status = Order.GEOCODING_PENDING
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(
@@ -279,3 +516,76 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return self.product.name
+
+
+class OrderCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        related_name='candidates',
+        verbose_name='Заказ',
+        on_delete=models.CASCADE,
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        related_name='order_candidates',
+        verbose_name='Ресторан',
+        on_delete=models.CASCADE,
+    )
+    distance = models.DecimalField(
+        verbose_name='Расстояние, км',
+        max_digits=8,
+        decimal_places=2
+    )
+
+    class Meta:
+        verbose_name = 'Подходящий ресторан'
+        verbose_name_plural = 'Подходящие рестораны'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+
+    def __str__(self):
+        return f"{self.order} - {self.restaurant}"
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=100,
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    image = models.ImageField(
+        'картинка',
+        upload_to='banners',
+    )
+    position = models.PositiveSmallIntegerField(
+        'порядок',
+        default=0,
+        db_index=True,
+    )
+    is_active = models.BooleanField(
+        'показывать',
+        default=True,
+    )
+    starts_at = models.DateTimeField(
+        'показывать с',
+        null=True,
+        blank=True,
+    )
+    ends_at = models.DateTimeField(
+        'показывать до',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,61 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimated_count = self.get_estimated_count()
+        if estimated_count is None or estimated_count < self.exact_count_limit:
+            return super().count
+        return estimated_count
+
+    def get_estimated_count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return None
+
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(self.object_list.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        return row and row[0]
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    per_page = 50
+    page_number = 1
+    related_fields = []
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            queryset = super().get_queryset().select_related(self.fk.name, *self.related_fields)
+            self.paginator = Paginator(queryset, self.per_page)
+            self.page = self.paginator.get_page(self.page_number)
+            self.page.object_list = list(self.page.object_list)
+        return self.page.object_list
+
+    @cached_property
+    def related_objects(self):
+        return {
+            field_name: {
+                str(getattr(obj, f'{field_name}_id')): getattr(obj, field_name)
+                for obj in self.get_queryset()
+            }
+            for field_name in self.related_fields
+        }
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        for field_name in self.related_fields:
+            widget = form.fields[field_name].widget
+            getattr(widget, 'widget', widget).cached_objects = self.related_objects[field_name]
@@ -0,0 +1,162 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from .models import Product
+
+VERSION_CACHE_KEY = 'foodcartapp:product_search_version'
+MERGE_MAX_POSTINGS = 64
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def get_terms(text):
+    text = unicodedata.normalize('NFKC', text).casefold().replace('ё', 'е')
+    return WORD_PATTERN.findall(text)
+
+
+def get_document_terms(*texts):
+    return {term for text in texts if text for term in get_terms(text)}
+
+
+def contains(product_ids, product_id):
+    position = bisect_left(product_ids, product_id)
+    return position < len(product_ids) and product_ids[position] == product_id
+
+
+def merge_postings(postings):
+    if len(postings) > MERGE_MAX_POSTINGS:
+        return [sorted(set().union(*postings))]
+    return postings
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        self.documents = {}
+        self.postings = {}
+        self.terms = []
+        self.version = None
+        self.lock = threading.Lock()
+
+    def add(self, product_id, *texts):
+        self.remove(product_id)
+
+        terms = get_document_terms(*texts)
+        self.documents[product_id] = terms
+        for term in terms:
+            if term not in self.postings:
+                insort(self.terms, term)
+                self.postings[term] = []
+            insort(self.postings[term], product_id)
+
+    def remove(self, product_id):
+        for term in self.documents.pop(product_id, ()):
+            product_ids = self.postings[term]
+            del product_ids[bisect_left(product_ids, product_id)]
+            if not product_ids:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+
+    def find_prefix(self, prefix):
+        position = bisect_left(self.terms, prefix)
+        postings = []
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            postings.append(self.postings[self.terms[position]])
+            position += 1
+        return postings
+
+    def search(self, query, limit=None):
+        prefixes = set(get_terms(query))
+        if not prefixes:
+            return []
+
+        with self.lock:
+            first_postings, *other_postings = sorted(
+                (merge_postings(self.find_prefix(prefix)) for prefix in prefixes),
+                key=lambda postings: sum(map(len, postings)),
+            )
+
+            found_ids = []
+            last_id = None
+            for product_id in heapq.merge(*first_postings):
+                if product_id == last_id:
+                    continue
+                last_id = product_id
+                if all(
+                    any(contains(product_ids, product_id) for product_ids in postings)
+                    for postings in other_postings
+                ):
+                    found_ids.append(product_id)
+                    if len(found_ids) == limit:
+                        break
+            return found_ids
+
+    def rebuild(self, version):
+        products = (
+            Product.objects
+            .available()
+            .order_by('id')
+            .values_list('id', 'name', 'category__name')
+        )
+        documents = {}
+        postings = defaultdict(list)
+        for product_id, name, category_name in products:
+            terms = get_document_terms(name, category_name)
+            documents[product_id] = terms
+            for term in terms:
+                postings[term].append(product_id)
+
+        with self.lock:
+            self.documents = documents
+            self.postings = dict(postings)
+            self.terms = sorted(postings)
+            self.version = version
+
+    def update(self, product_ids, version):
+        products = (
+            Product.objects
+            .available()
+            .filter(id__in=product_ids)
+            .values_list('id', 'name', 'category__name')
+        )
+        with self.lock:
+            missing_ids = set(product_ids)
+            for product_id, name, category_name in products:
+                self.add(product_id, name, category_name)
+                missing_ids.discard(product_id)
+            for product_id in missing_ids:
+                self.remove(product_id)
+            self.version = version
+
+
+product_search_index = ProductSearchIndex()
+
+
+def get_product_search_index():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None or version != product_search_index.version:
+        if version is None:
+            version = uuid4().hex
+            cache.set(VERSION_CACHE_KEY, version, None)
+        product_search_index.rebuild(version)
+    return product_search_index
+
+
+def update_product_search_index(product_ids):
+    is_fresh = (
+        product_search_index.version is not None
+        and product_search_index.version == cache.get(VERSION_CACHE_KEY)
+    )
+    version = uuid4().hex
+    cache.set(VERSION_CACHE_KEY, version, None)
+    if is_fresh:
+        product_search_index.update(product_ids, version)
+
+
+def reset_product_search_index():
+    cache.delete(VERSION_CACHE_KEY)
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from places.models import Place
+from .availability import reset_availability_index, reset_restaurants_grid
+from .caching import (BANNERS_CACHE_KEY, BOOTSTRAP_CACHE_KEY, PRODUCTS_CACHE_KEY,
+                      reset_cached_json)
+from .candidates import (invalidate_candidates, invalidate_product_candidates,
+                         invalidate_restaurant_candidates)
+from .models import (Banner, Order, Product, ProductCategory, Restaurant,
+                     RestaurantMenuItem, menu_items_changed)
+from .search import reset_product_search_index, update_product_search_index
+
+
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def update_product_availability(instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).update_availability()
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def reset_product_list_cache(**kwargs):
+    reset_cached_json(PRODUCTS_CACHE_KEY, BOOTSTRAP_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def reset_banner_list_cache(**kwargs):
+    reset_cached_json(BANNERS_CACHE_KEY, BOOTSTRAP_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def update_product_search(instance, **kwargs):
+    update_product_search_index([instance.id])
+
+
+@receiver([post_save, post_delete], sender=ProductCategory)
+def reset_product_search(**kwargs):
+    reset_product_search_index()
+
+
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def reset_menu_caches(instance, **kwargs):
+    reset_availability_index()
+    update_product_search_index([instance.product_id])
+    invalidate_product_candidates(instance.product_id)
+
+
+@receiver(menu_items_changed)
+def reset_bulk_menu_caches(product_ids, **kwargs):
+    reset_cached_json(PRODUCTS_CACHE_KEY, BOOTSTRAP_CACHE_KEY)
+    reset_availability_index()
+    update_product_search_index(product_ids)
+    invalidate_candidates(Order.objects.filter(order_items__product_id__in=product_ids))
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def reset_restaurant_location_caches(**kwargs):
+    reset_restaurants_grid()
+
+
+@receiver(post_save, sender=Restaurant)
+def reset_restaurant_candidates(instance, **kwargs):
+    if getattr(instance, 'location_changed', True):
+        invalidate_restaurant_candidates([instance])
+
+
+@receiver([post_save, post_delete], sender=Place)
+def reset_restaurant_place_caches(instance, **kwargs):
+    if Restaurant.objects.filter(address=instance.address).exists():
+        reset_restaurants_grid()
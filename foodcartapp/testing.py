@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Product, Restaurant
+
+
+RESTAURANT_STREETS = ['Арбат', 'Тверская', 'Охотный ряд']
+
+
+def create_admin():
+    return User.objects.create_superuser('admin', password='secret')
+
+
+def create_manager():
+    return User.objects.create_user('manager', password='secret', is_staff=True)
+
+
+def create_restaurants(count=len(RESTAURANT_STREETS)):
+    return [
+        Restaurant.objects.create(name=f'Star Burger {street}', address=f'Москва, {street} 1')
+        for street in RESTAURANT_STREETS[:count]
+    ]
+
+
+def create_products(count, **fields):
+    fields = {'price': 100, 'image': 'burger.jpg', **fields}
+    return [
+        Product.objects.create(name=f'Бургер {number:03}', **fields)
+        for number in range(count)
+    ]
+
+
+def count_queries(func, *args, **kwargs):
+    with CaptureQueriesContext(connection) as queries:
+        result = func(*args, **kwargs)
+    return result, len(queries)
@@ -0,0 +1,930 @@
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from importlib import import_module
+from itertools import product as cartesian_product
+from unittest import mock
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from places.cache import place_cache
+from places.models import GeocodingTask, Place
+
+from .assignment import solve_assignment
+from .availability import CACHE_KEY as AVAILABILITY_CACHE_KEY
+from .availability import get_availability_index
+from .candidates import attach_restaurant_places, refresh_stale_candidates
+from .search import VERSION_CACHE_KEY as SEARCH_VERSION_CACHE_KEY
+from .models import (Banner, Order, OrderItem, Product, ProductCategory, Restaurant,
+                     RestaurantMenuItem, find_place)
+from .testing import count_queries, create_admin, create_products, create_restaurants
+
+
+def get_uncached_queries(queries):
+    cache_table = getattr(cache, '_table', None)
+    return [
+        query['sql'] for query in queries
+        if not cache_table or cache_table not in query['sql']
+    ]
+
+
+class RegisterOrderTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.products = create_products(10, category=category)
+
+    def post_order(self, products, address='Москва, Тверская 1'):
+        return self.client.post('/api/order/', {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79001234567',
+            'address': address,
+            'products': [
+                {'product': product.id, 'quantity': 2}
+                for product in products
+            ],
+        }, content_type='application/json')
+
+    def count_order_queries(self, products, address):
+        response, queries_count = count_queries(self.post_order, products, address)
+        self.assertEqual(response.status_code, 200)
+        return queries_count
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        single_item_queries = self.count_order_queries(self.products[:1], 'Москва, Арбат 1')
+        full_cart_queries = self.count_order_queries(self.products, 'Москва, Арбат 2')
+
+        self.assertEqual(single_item_queries, full_cart_queries)
+
+    def test_items_keep_product_price(self):
+        self.post_order(self.products[:3])
+
+        order = Order.objects.get()
+        prices = OrderItem.objects.filter(order=order).values_list('product__price', 'price')
+        self.assertEqual(len(prices), 3)
+        for product_price, item_price in prices:
+            self.assertEqual(product_price, item_price)
+        self.assertEqual(order.total_price, sum(product.price * 2 for product in self.products[:3]))
+
+    def test_unknown_product_is_rejected(self):
+        response = self.post_order([Product(id=0), *self.products[:1]])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('products', response.json())
+        self.assertFalse(Order.objects.exists())
+
+
+class PlaceForeignKeyTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.place = Place.objects.create(address='Москва, Арбат 1', lng=37.59, lat=55.75)
+
+    def setUp(self):
+        self.addCleanup(place_cache.places.clear)
+
+    def test_restaurant_is_geocoded_only_when_address_changes(self):
+        restaurant = Restaurant.objects.create(name='Star Burger Арбат', address='Москва, Арбат 1')
+        self.assertEqual(restaurant.place, self.place)
+
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        restaurant.name = 'Star Burger Старый Арбат'
+        with mock.patch('foodcartapp.models.find_place') as find_place:
+            restaurant.save()
+        find_place.assert_not_called()
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).place, self.place)
+
+        restaurant.address = 'Москва, Тверская 1'
+        restaurant.save()
+        self.assertIsNone(Restaurant.objects.get(pk=restaurant.pk).place)
+        self.assertTrue(GeocodingTask.objects.filter(address='Москва, Тверская 1').exists())
+
+    def test_deleted_place_is_not_reused(self):
+        product, = create_products(1)
+        self.assertEqual(find_place(self.place.address), self.place)
+        self.place.delete()
+
+        response = self.client.post('/api/order/', {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79001234567',
+            'address': 'Москва, Арбат 1',
+            'products': [{'product': product.id, 'quantity': 1}],
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(Order.objects.get().place)
+
+    def test_migration_backfills_places(self):
+        restaurant = Restaurant.objects.create(name='Star Burger Арбат', address='Москва, Арбат 1')
+        order = Order.objects.create(firstname='Иван', phonenumber='+79001234567', address='Москва, Арбат 1')
+        unknown_order = Order.objects.create(
+            firstname='Пётр',
+            phonenumber='+79001234568',
+            address='Москва, Тверская 1',
+        )
+        Restaurant.objects.update(place=None)
+        Order.objects.update(place=None)
+
+        import_module('foodcartapp.migrations.0063_fill_places').fill_places(apps, None)
+
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).place, self.place)
+        self.assertEqual(Order.objects.get(pk=order.pk).place, self.place)
+        self.assertIsNone(Order.objects.get(pk=unknown_order.pk).place)
+
+
+class OrderTotalPriceTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin()
+        cls.products = create_products(2)
+        cls.products[1].price = 200
+        cls.products[1].save()
+        cls.order = Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79001234567',
+            address='Москва, Тверская 1',
+        )
+        cls.order_items = [
+            OrderItem.objects.create(order=cls.order, product=product, quantity=1, price=product.price)
+            for product in cls.products
+        ]
+        cls.order.update_total_price()
+
+    def test_admin_inline_changes_update_total(self):
+        self.client.force_login(self.admin)
+        data = {
+            'firstname': self.order.firstname,
+            'lastname': '',
+            'phonenumber': self.order.phonenumber,
+            'address': self.order.address,
+            'status': self.order.status,
+            'payment': self.order.payment,
+            'geocoding_status': self.order.geocoding_status,
+            'comment': '',
+            'created_at_0': self.order.created_at.strftime('%d.%m.%Y'),
+            'created_at_1': self.order.created_at.strftime('%H:%M:%S'),
+            'order_items-TOTAL_FORMS': 2,
+            'order_items-INITIAL_FORMS': 2,
+            'order_items-MIN_NUM_FORMS': 0,
+            'order_items-MAX_NUM_FORMS': 1000,
+        }
+        for index, order_item in enumerate(self.order_items):
+            data.update({
+                f'order_items-{index}-id': order_item.id,
+                f'order_items-{index}-order': self.order.id,
+                f'order_items-{index}-product': order_item.product_id,
+                f'order_items-{index}-quantity': 3 if index else 1,
+                f'order_items-{index}-price': order_item.price,
+            })
+        data['order_items-0-DELETE'] = 'on'
+
+        response = self.client.post(f'/admin/foodcartapp/order/{self.order.id}/change/', data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).total_price, 600)
+
+    def test_repair_command_fixes_drift(self):
+        Order.objects.filter(pk=self.order.pk).update(total_price=1)
+        stdout = StringIO()
+
+        call_command('repair_order_totals', '--check', stdout=stdout)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).total_price, 1)
+        self.assertIn('Расхождений: 1', stdout.getvalue())
+
+        call_command('repair_order_totals', stdout=StringIO())
+        self.assertEqual(Order.objects.get(pk=self.order.pk).total_price, 300)
+
+        stdout = StringIO()
+        call_command('repair_order_totals', stdout=stdout)
+        self.assertIn('Расхождений: 0', stdout.getvalue())
+
+
+class ProductListApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.product = Product.objects.create(
+            name='Чизбургер',
+            category=category,
+            price=150,
+            image='burger.jpg',
+        )
+        cls.restaurant = Restaurant.objects.create(
+            name='Star Burger Арбат',
+            address='Москва, Арбат 1',
+        )
+        RestaurantMenuItem.objects.create(
+            restaurant=cls.restaurant,
+            product=cls.product,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_menu(self, category, count):
+        products = []
+        for number in range(count):
+            product = Product.objects.create(
+                name=f'{category.name} {number}',
+                category=category,
+                price=100,
+                image='burger.jpg',
+                description='Очень длинное описание',
+            )
+            RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=product)
+            products.append(product)
+        return products
+
+    def test_warm_cache_does_not_query_database(self):
+        first_response = self.client.get('/api/products/')
+
+        with CaptureQueriesContext(connection) as queries:
+            second_response = self.client.get('/api/products/')
+        self.assertEqual(get_uncached_queries(queries), [])
+
+        self.assertEqual(first_response.content, second_response.content)
+        self.assertEqual(first_response['ETag'], second_response['ETag'])
+        self.assertEqual(second_response.json()[0]['name'], 'Чизбургер')
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get('/api/products/')['ETag']
+
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_catalog_changes_reset_cache(self):
+        etag = self.client.get('/api/products/')['ETag']
+
+        self.product.name = 'Двойной чизбургер'
+        self.product.save()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], 'Двойной чизбургер')
+
+        RestaurantMenuItem.objects.filter(product=self.product).delete()
+        self.assertEqual(self.client.get('/api/products/').json(), [])
+
+    def test_pages_follow_next_link(self):
+        drinks = self.create_menu(ProductCategory.objects.create(name='Напитки'), 5)
+        self.create_menu(ProductCategory.objects.create(name='Десерты'), 3)
+
+        product_ids = []
+        url = f'/api/products/?category={drinks[0].category_id}&limit=2&fields=id,name'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('description', queries[0]['sql'])
+            for product in response.json():
+                self.assertEqual(set(product), {'id', 'name'})
+                product_ids.append(product['id'])
+            url = response.get('Link', '')[1:].partition('>')[0]
+
+        self.assertEqual(product_ids, [product.id for product in drinks])
+
+    def test_invalid_params_are_rejected(self):
+        for query in ['fields=id,secret', 'limit=0', 'after=abc', 'category=x']:
+            response = self.client.get(f'/api/products/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class ProductSearchApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurant = Restaurant.objects.create(
+            name='Star Burger Арбат',
+            address='Москва, Арбат 1',
+        )
+        burgers = ProductCategory.objects.create(name='Бургеры')
+        drinks = ProductCategory.objects.create(name='Напитки')
+        cls.products = {}
+        for name, category in [
+            ('Чизбургер', burgers),
+            ('Двойной ЧИЗБУРГЕР', burgers),
+            ('Ёжик в тумане', drinks),
+            ('Клубничный коктейль', drinks),
+        ]:
+            cls.products[name] = Product.objects.create(
+                name=name,
+                category=category,
+                price=100,
+                image='burger.jpg',
+            )
+            RestaurantMenuItem.objects.create(
+                restaurant=cls.restaurant,
+                product=cls.products[name],
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get('/api/products/search/', {'q': query, 'fields': 'name'})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.json()]
+
+    def test_matches_prefixes_case_insensitively(self):
+        self.assertEqual(self.search('чИз'), ['Чизбургер', 'Двойной ЧИЗБУРГЕР'])
+        self.assertEqual(self.search('двойн чиз'), ['Двойной ЧИЗБУРГЕР'])
+        self.assertEqual(self.search('ежик'), ['Ёжик в тумане'])
+        self.assertEqual(self.search('напит клуб'), ['Клубничный коктейль'])
+        self.assertEqual(self.search('пицца'), [])
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(self.search('коктейль'), ['Клубничный коктейль'])
+
+        product = self.products['Чизбургер']
+        product.name = 'Молочный коктейль'
+        product.save()
+        RestaurantMenuItem.objects.filter(product=self.products['Клубничный коктейль']).delete()
+
+        self.assertEqual(self.search('коктейль'), ['Молочный коктейль'])
+        self.assertEqual(self.search('чизбургер'), ['Двойной ЧИЗБУРГЕР'])
+
+    def test_version_key_rebuilds_index_changed_elsewhere(self):
+        self.assertEqual(self.search('коктейль'), ['Клубничный коктейль'])
+
+        Product.objects.filter(pk=self.products['Чизбургер'].pk).update(name='Молочный коктейль')
+        self.assertEqual(self.search('коктейль'), ['Клубничный коктейль'])
+
+        cache.set(SEARCH_VERSION_CACHE_KEY, uuid4().hex, None)
+        self.assertEqual(self.search('коктейль'), ['Молочный коктейль', 'Клубничный коктейль'])
+
+
+class ProductAvailabilityTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants = create_restaurants(2)
+        cls.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertAvailable(self, is_available):
+        self.assertEqual(
+            Product.objects.filter(pk=self.product.pk, is_available=True).exists(),
+            is_available,
+        )
+
+    def test_flag_follows_menu_items(self):
+        self.assertAvailable(False)
+
+        menu_item = RestaurantMenuItem.objects.create(restaurant=self.restaurants[0], product=self.product)
+        self.assertAvailable(True)
+
+        self.product.save()
+        self.assertAvailable(True)
+
+        menu_item.availability = False
+        menu_item.save()
+        self.assertAvailable(False)
+
+        menu_item.delete()
+        self.assertAvailable(False)
+
+    def test_flag_follows_bulk_changes(self):
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=self.product)
+            for restaurant in self.restaurants
+        ])
+        self.assertAvailable(True)
+
+        RestaurantMenuItem.objects.update(availability=False)
+        self.assertAvailable(False)
+
+        menu_item = RestaurantMenuItem.objects.first()
+        menu_item.availability = True
+        RestaurantMenuItem.objects.bulk_update([menu_item], ['availability'])
+        self.assertAvailable(True)
+
+    def test_save_keeps_availability_flag(self):
+        product = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=product.pk).update(is_available=True)
+
+        product.price = 150
+        with mock.patch('foodcartapp.models.make_image_variants') as make_variants:
+            with CaptureQueriesContext(connection) as queries:
+                product.save()
+        make_variants.assert_not_called()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "foodcartapp_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"price"', updates[0])
+        self.assertNotIn('"is_available"', updates[0])
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.price, 150)
+        self.assertTrue(product.is_available)
+
+    def test_save_after_refresh_writes_reverted_value(self):
+        product = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=product.pk).update(price=150)
+
+        product.refresh_from_db()
+        product.price = 100
+        product.save()
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, 100)
+
+    def test_bulk_changes_reset_product_caches(self):
+        restaurant = self.restaurants[0]
+        self.assertEqual(self.client.get('/api/products/').json(), [])
+        self.assertEqual(self.client.get('/api/products/search/', {'q': 'чиз'}).json(), [])
+
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=self.product),
+        ])
+
+        self.assertEqual(len(self.client.get('/api/products/').json()), 1)
+        self.assertEqual(len(self.client.get('/api/bootstrap/').json()['products']), 1)
+        self.assertEqual(len(self.client.get('/api/products/search/', {'q': 'чиз'}).json()), 1)
+        self.assertEqual(get_availability_index().find_restaurants([self.product.id]), [restaurant.id])
+
+    def test_repair_command_fixes_drift(self):
+        RestaurantMenuItem.objects.create(restaurant=self.restaurants[0], product=self.product)
+        Product.objects.update(is_available=False)
+
+        call_command('repair_product_availability', '--check', stdout=StringIO())
+        self.assertAvailable(False)
+
+        call_command('repair_product_availability', stdout=StringIO())
+        self.assertAvailable(True)
+
+
+class RestaurantAvailabilityIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants = create_restaurants()
+        cls.products = create_products(3)
+        for restaurant, product, availability in [
+            (0, 0, True),
+            (1, 0, True),
+            (2, 0, False),
+            (0, 1, True),
+            (2, 1, True),
+        ]:
+            RestaurantMenuItem.objects.create(
+                restaurant=cls.restaurants[restaurant],
+                product=cls.products[product],
+                availability=availability,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def find_restaurants(self, *products):
+        return set(get_availability_index().find_restaurants([product.id for product in products]))
+
+    def test_finds_restaurants_with_every_product(self):
+        index = get_availability_index()
+
+        self.assertEqual(index.get_mask([]), 0)
+        self.assertEqual(index.get_mask([self.products[2].id]), 0)
+        self.assertEqual(self.find_restaurants(self.products[0]), {self.restaurants[0].id, self.restaurants[1].id})
+        self.assertEqual(self.find_restaurants(self.products[0], self.products[1]), {self.restaurants[0].id})
+        self.assertEqual(self.find_restaurants(self.products[0], self.products[2]), set())
+
+    def test_menu_changes_reset_shared_index(self):
+        self.find_restaurants(self.products[0])
+        self.assertIsNotNone(cache.get(AVAILABILITY_CACHE_KEY))
+
+        RestaurantMenuItem.objects.filter(restaurant=self.restaurants[2], product=self.products[0]).update(
+            availability=True
+        )
+        self.assertIsNone(cache.get(AVAILABILITY_CACHE_KEY))
+        self.assertEqual(
+            self.find_restaurants(self.products[0]),
+            {restaurant.id for restaurant in self.restaurants},
+        )
+
+        RestaurantMenuItem.objects.get(restaurant=self.restaurants[0], product=self.products[1]).delete()
+        self.assertEqual(self.find_restaurants(self.products[1]), {self.restaurants[2].id})
+
+
+class OrderCandidatesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Place.objects.create(address='Москва, Арбат 1', lng=37.59, lat=55.75)
+        Place.objects.create(address='Москва, Тверская 1', lng=37.61, lat=55.76)
+        cls.place = Place.objects.create(address='Москва, Охотный ряд 1', lng=37.615, lat=55.757)
+        cls.product = Product.objects.create(name='Чизбургер', price=100, image='burger.jpg')
+        cls.restaurants = create_restaurants(2)
+        for restaurant in cls.restaurants:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=cls.product)
+        cls.order = Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79001234567',
+            address=cls.place.address,
+            place=cls.place,
+            geocoding_status=Order.GEOCODING_RESOLVED,
+        )
+        OrderItem.objects.create(order=cls.order, product=cls.product, quantity=1, price=100)
+
+    def setUp(self):
+        self.addCleanup(place_cache.places.clear)
+        cache.clear()
+
+    def refresh(self):
+        refresh_stale_candidates(batch_size=10)
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertTrue(order.candidates_computed)
+        return list(order.candidates.order_by('distance').values_list('restaurant__name', flat=True))
+
+    def test_menu_change_recomputes_candidates(self):
+        self.assertEqual(self.refresh(), ['Star Burger Тверская', 'Star Burger Арбат'])
+        get_availability_index()
+
+        menu_item = RestaurantMenuItem.objects.get(restaurant=self.restaurants[1])
+        menu_item.availability = False
+        menu_item.save()
+
+        self.assertFalse(Order.objects.get(pk=self.order.pk).candidates_computed)
+        with mock.patch('foodcartapp.availability.cache.get', return_value=None) as cache_get:
+            self.assertEqual(self.refresh(), ['Star Burger Арбат'])
+        cache_get.assert_not_called()
+
+    def test_only_address_change_recomputes_candidates(self):
+        self.refresh()
+        restaurant = Restaurant.objects.get(pk=self.restaurants[0].pk)
+
+        restaurant.contact_phone = '+74950000000'
+        restaurant.save()
+        self.assertTrue(Order.objects.get(pk=self.order.pk).candidates_computed)
+
+        restaurant.address = 'Москва, Охотный ряд 1'
+        restaurant.save()
+        self.assertFalse(Order.objects.get(pk=self.order.pk).candidates_computed)
+
+    def test_attached_restaurant_place_recomputes_candidates(self):
+        self.refresh()
+        restaurant = Restaurant.objects.create(name='Star Burger Охотный ряд', address='Москва, Охотный ряд 2')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=self.product)
+        self.assertIsNone(restaurant.place)
+        self.refresh()
+
+        Place.objects.create(address=restaurant.address, lng=37.616, lat=55.757)
+        attach_restaurant_places([restaurant.address])
+
+        self.assertIsNotNone(Restaurant.objects.get(pk=restaurant.pk).place)
+        self.assertFalse(Order.objects.get(pk=self.order.pk).candidates_computed)
+        self.assertEqual(self.refresh()[0], 'Star Burger Охотный ряд')
+
+
+class BannerListApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def get_titles(self):
+        return [banner['title'] for banner in self.client.get('/api/banners/').json()]
+
+    def test_migrated_banners_are_served_from_cache(self):
+        response = self.client.get('/api/banners/')
+        self.assertEqual(
+            [banner['title'] for banner in response.json()],
+            ['Burger', 'Spices', 'New York'],
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            repeated_response = self.client.get('/api/banners/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(get_uncached_queries(queries), [])
+        self.assertEqual(repeated_response.status_code, 304)
+
+    def test_migration_reuses_copied_images(self):
+        Banner.objects.all().delete()
+
+        with mock.patch.object(default_storage, 'save') as save:
+            import_module('foodcartapp.migrations.0072_fill_banners').create_banners(apps, None)
+
+        save.assert_not_called()
+        self.assertEqual(Banner.objects.count(), 3)
+        self.assertTrue(all(default_storage.exists(banner.image.name) for banner in Banner.objects.all()))
+
+    def test_order_and_active_window(self):
+        Banner.objects.all().delete()
+        now = timezone.now()
+        Banner.objects.create(title='Второй', image='banners/b.jpg', position=2)
+        Banner.objects.create(title='Первый', image='banners/a.jpg', position=1)
+        Banner.objects.create(title='Скрытый', image='banners/c.jpg', is_active=False)
+        Banner.objects.create(title='Прошедший', image='banners/d.jpg', ends_at=now - timedelta(hours=1))
+        upcoming = Banner.objects.create(
+            title='Будущий',
+            image='banners/e.jpg',
+            starts_at=now + timedelta(hours=1),
+        )
+
+        self.assertEqual(self.get_titles(), ['Первый', 'Второй'])
+
+        upcoming.starts_at = now - timedelta(minutes=1)
+        upcoming.save()
+        self.assertEqual(self.get_titles(), ['Будущий', 'Первый', 'Второй'])
+
+
+class BootstrapApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        restaurant, = create_restaurants(1)
+        for product in create_products(
+            20,
+            category=category,
+            description='Сочная котлета, свежие овощи и фирменный соус',
+        ):
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_returns_compressed_catalog_and_banners(self):
+        response = self.client.get('/api/bootstrap/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        bootstrap = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(bootstrap['products']), 20)
+        self.assertEqual(bootstrap['categories'], [{'id': bootstrap['products'][0]['category']['id'], 'name': 'Бургеры'}])
+        self.assertEqual(len(bootstrap['banners']), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            plain_response = self.client.get('/api/bootstrap/')
+        self.assertEqual(get_uncached_queries(queries), [])
+        self.assertNotIn('Content-Encoding', plain_response)
+        self.assertEqual(json.loads(plain_response.content), bootstrap)
+        self.assertNotEqual(plain_response['ETag'], response['ETag'])
+
+        repeated_response = self.client.get(
+            '/api/bootstrap/',
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(repeated_response.status_code, 304)
+
+    def test_banner_changes_reset_cache(self):
+        etag = self.client.get('/api/bootstrap/')['ETag']
+
+        Banner.objects.filter(title='Spices').update(is_active=False)
+        Banner.objects.get(title='Burger').save()
+
+        response = self.client.get('/api/bootstrap/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [banner['title'] for banner in response.json()['banners']],
+            ['Burger', 'New York'],
+        )
+
+
+class ProductImageVariantsTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        cache.clear()
+
+    def make_upload(self, size, name='burger.png'):
+        content = BytesIO()
+        Image.new('RGBA', size, (200, 100, 0, 128)).save(content, 'PNG')
+        return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+    def test_upload_generates_variants_without_upscaling(self):
+        product = Product.objects.create(name='Бургер', price=100, image=self.make_upload((300, 150)))
+
+        widths = product.image_variants['widths']
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        self.assertEqual(set(widths), {'100', '200', '400', '800'})
+        for width, paths in widths.items():
+            self.assertEqual(set(paths), {'webp', 'jpeg'})
+            with default_storage.open(paths['jpeg']) as jpeg, Image.open(jpeg) as thumbnail:
+                self.assertEqual(thumbnail.format, 'JPEG')
+                self.assertEqual(thumbnail.width, min(int(width), 300))
+                self.assertEqual(thumbnail.height, min(int(width), 300) // 2)
+
+    def test_new_image_replaces_variants(self):
+        product = Product.objects.create(name='Бургер', price=100, image=self.make_upload((300, 150)))
+        old_path = product.image_variants['widths']['100']['webp']
+
+        product.image = self.make_upload((120, 120), 'cheeseburger.png')
+        product.save()
+
+        self.assertFalse(default_storage.exists(old_path))
+        self.assertIn('cheeseburger', product.image_variants['widths']['100']['webp'])
+
+    def test_api_exposes_variant_urls(self):
+        product = Product.objects.create(name='Бургер', price=100, image=self.make_upload((300, 150)))
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, Арбат 1')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+        dumped_product = self.client.get('/api/products/').json()[0]
+
+        self.assertEqual(
+            dumped_product['image_variants']['200']['webp'],
+            default_storage.url(product.image_variants['widths']['200']['webp']),
+        )
+
+    def test_missing_image_leaves_original(self):
+        product = Product.objects.create(name='Бургер', price=100, image='missing.jpg')
+
+        self.assertEqual(product.image_variants, {})
+        self.assertEqual(product.get_image_variant_url(100), product.image.url)
+
+
+class AdminChangelistTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin()
+        restaurants = create_restaurants()
+        for number in range(30):
+            Order.objects.create(
+                firstname='Иван',
+                lastname=f'Петров {number}',
+                phonenumber='+79001234567',
+                address=f'Москва, Тверская {number}',
+                restaurant=restaurants[number % 3],
+            )
+            Place.objects.create(address=f'Москва, Тверская {number}', lng=37.6, lat=55.7)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_changelist_queries(self, url):
+        response, queries_count = count_queries(self.client.get, url)
+        self.assertEqual(response.status_code, 200)
+        return queries_count
+
+    def test_order_rows_do_not_add_queries(self):
+        few_rows_queries = self.count_changelist_queries('/admin/foodcartapp/order/?q=Петров+1')
+        all_rows_queries = self.count_changelist_queries('/admin/foodcartapp/order/')
+
+        self.assertEqual(few_rows_queries, all_rows_queries)
+
+    def test_filters_and_search(self):
+        response = self.client.get('/admin/foodcartapp/order/', {
+            'status__exact': Order.NOT_PROCESSED,
+            'payment__exact': Order.NOT_SELECTED,
+            'q': 'Петров 29',
+        })
+
+        self.assertEqual(list(response.context['cl'].result_list), list(Order.objects.filter(lastname='Петров 29')))
+
+    def test_place_rows_do_not_add_queries(self):
+        few_rows_queries = self.count_changelist_queries('/admin/places/place/?q=Тверская+1')
+        all_rows_queries = self.count_changelist_queries('/admin/places/place/')
+
+        self.assertEqual(few_rows_queries, all_rows_queries)
+
+
+class PaginatedInlineTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_admin()
+        cls.small_restaurant, cls.large_restaurant = create_restaurants(2)
+        for number, product in enumerate(create_products(120)):
+            RestaurantMenuItem.objects.create(restaurant=cls.large_restaurant, product=product)
+            if number < 10:
+                RestaurantMenuItem.objects.create(restaurant=cls.small_restaurant, product=product)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_change_page(self, restaurant, query=''):
+        url = f'/admin/foodcartapp/restaurant/{restaurant.id}/change/{query}'
+        response, queries_count = count_queries(self.client.get, url)
+        self.assertEqual(response.status_code, 200)
+        return response, queries_count
+
+    def test_change_page_does_not_depend_on_menu_size(self):
+        self.get_change_page(self.small_restaurant)
+        _, small_menu_queries = self.get_change_page(self.small_restaurant)
+        response, large_menu_queries = self.get_change_page(self.large_restaurant)
+
+        self.assertEqual(small_menu_queries, large_menu_queries)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), 50)
+        self.assertNotContains(response, '<option value="{}"'.format(Product.objects.last().id))
+
+    def get_change_form_data(self, formset):
+        data = {
+            'name': self.large_restaurant.name,
+            'address': self.large_restaurant.address,
+            'contact_phone': '',
+            'capacity': 10,
+            'menu_items-TOTAL_FORMS': len(formset.forms),
+            'menu_items-INITIAL_FORMS': len(formset.forms),
+            'menu_items-MIN_NUM_FORMS': 0,
+            'menu_items-MAX_NUM_FORMS': 1000,
+        }
+        for index, form in enumerate(formset.forms):
+            data[f'menu_items-{index}-id'] = form.instance.id
+            data[f'menu_items-{index}-restaurant'] = self.large_restaurant.id
+            data[f'menu_items-{index}-product'] = form.instance.product_id
+            if index:
+                data[f'menu_items-{index}-availability'] = 'on'
+        return data
+
+    def test_last_page_is_saved(self):
+        response, _ = self.get_change_page(self.large_restaurant, '?menu_items-page=3')
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(len(formset.forms), 20)
+
+        response = self.client.post(
+            f'/admin/foodcartapp/restaurant/{self.large_restaurant.id}/change/?menu_items-page=3',
+            self.get_change_form_data(formset),
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(self.large_restaurant.menu_items.filter(availability=False)),
+            [formset.forms[0].instance],
+        )
+
+    def test_product_page_uses_restaurant_autocomplete(self):
+        product = self.large_restaurant.menu_items.first().product
+
+        response = self.client.get(f'/admin/foodcartapp/product/{product.id}/change/')
+
+        self.assertEqual(response.status_code, 200)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.related_fields, ['restaurant'])
+        self.assertEqual(len(formset.forms), 2)
+
+    def test_save_and_continue_keeps_page(self):
+        change_url = f'/admin/foodcartapp/restaurant/{self.large_restaurant.id}/change/'
+        response, _ = self.get_change_page(self.large_restaurant, '?menu_items-page=2')
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertNotIn('restaurant', formset.related_fields)
+
+        response = self.client.post(
+            f'{change_url}?menu_items-page=2',
+            {**self.get_change_form_data(formset), '_continue': 'Сохранить и продолжить'},
+        )
+
+        self.assertRedirects(response, f'{change_url}?menu_items-page=2', fetch_redirect_response=False)
+
+
+class SolveAssignmentTest(TestCase):
+
+    def test_respects_capacity_and_minimises_distance(self):
+        order_candidates = [
+            [(0, 1.0), (1, 2.0)],
+            [(0, 1.5), (1, 5.0)],
+            [(0, 1.2)],
+            [(1, 3.0), (2, 9.0)],
+        ]
+        capacities = {0: 2, 1: 1, 2: 1}
+
+        assigned_restaurants = solve_assignment(order_candidates, capacities)
+
+        best_assignment = None
+        for assignment in cartesian_product(*[
+            [restaurant for restaurant, _ in candidates] + [None]
+            for candidates in order_candidates
+        ]):
+            if any(
+                assignment.count(restaurant) > capacity
+                for restaurant, capacity in capacities.items()
+            ):
+                continue
+            distances = dict(
+                ((order_index, restaurant), distance)
+                for order_index, candidates in enumerate(order_candidates)
+                for restaurant, distance in candidates
+            )
+            score = (
+                assignment.count(None),
+                sum(
+                    distances[order_index, restaurant]
+                    for order_index, restaurant in enumerate(assignment)
+                    if restaurant is not None
+                ),
+            )
+            if best_assignment is None or score < best_assignment[0]:
+                best_assignment = (score, list(assignment))
+
+        self.assertEqual(assigned_restaurants, best_assignment[1])
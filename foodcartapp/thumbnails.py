@@ -0,0 +1,63 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+IMAGE_VARIANT_WIDTHS = [100, 200, 400, 800]
+IMAGE_VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+}
+IMAGE_VARIANTS_DIR = 'thumbnails'
+
+
+def resize_to_width(image, width):
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def convert_for_format(image, extension):
+    if not has_alpha(image):
+        return image.convert('RGB')
+
+    image = image.convert('RGBA')
+    if extension == 'webp':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def make_image_variants(image_file):
+    storage = image_file.storage
+    stem = os.path.splitext(os.path.basename(image_file.name))[0]
+
+    with image_file.open('rb'), Image.open(image_file) as image:
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    widths = {}
+    for width in IMAGE_VARIANT_WIDTHS:
+        resized = resize_to_width(image, width)
+        widths[str(width)] = {}
+        for extension, save_options in IMAGE_VARIANT_FORMATS.items():
+            content = BytesIO()
+            convert_for_format(resized, extension).save(content, **save_options)
+            widths[str(width)][extension] = storage.save(
+                f'{IMAGE_VARIANTS_DIR}/{stem}_{width}.{extension}',
+                ContentFile(content.getvalue()),
+            )
+    return {'source': image_file.name, 'widths': widths}
+
+
+def delete_image_variants(storage, image_variants):
+    for paths in image_variants.get('widths', {}).values():
+        for path in paths.values():
+            storage.delete(path)
@@ -1,12 +1,15 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from .views import (banners_list_api, bootstrap_api, product_list_api,
+                    product_search_api, register_order)
 
 
 app_name = "foodcartapp"
 
 urlpatterns = [
     path('products/', product_list_api),
+    path('products/search/', product_search_api),
     path('banners/', banners_list_api),
+    path('bootstrap/', bootstrap_api),
     path('order/', register_order),
 ]
@@ -1,22 +1,45 @@
-import requests
+import math
+
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django.db.models import Q
+from django.http import HttpResponseBadRequest
+from django.utils import timezone
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer
-
-from places.models import Place
-from .models import Order, OrderItem, Product
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import (IntegerField, ModelSerializer,
+                                        ValidationError)
+
+from .caching import (BANNERS_CACHE_KEY, BOOTSTRAP_CACHE_KEY, CACHE_TIMEOUT,
+                      PRODUCTS_CACHE_KEY, cache_json, cached_json_response,
+                      conditional_json_response, make_json_payload)
+from .models import Banner, Order, OrderItem, Product, ProductCategory
+from .search import get_product_search_index
+
+PRODUCT_LIST_PARAMS = {'after', 'limit', 'fields', 'category'}
+PRODUCT_FIELDS = {
+    'id': ['id'],
+    'name': ['name'],
+    'price': ['price'],
+    'special_status': ['special_status'],
+    'description': ['description'],
+    'category': ['category_id', 'category__name'],
+    'image': ['image'],
+    'image_variants': ['image_variants'],
+    'restaurant': ['name'],
+}
+PRODUCT_IMAGE_STORAGE = Product._meta.get_field('image').storage
 
 
 class OrderItemSerializer(ModelSerializer):
+    product = IntegerField()
 
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
-    
+
 
 class OrderSerializer(ModelSerializer):
     products = OrderItemSerializer(many=True, allow_empty=False, write_only=True)
@@ -25,109 +48,207 @@ class OrderSerializer(ModelSerializer):
         model = Order
         fields = ['id', 'firstname', 'lastname', 'phonenumber' , 'address', 'products']
 
+    def validate_products(self, products):
+        product_ids = {item['product'] for item in products}
+        found_products = Product.objects.in_bulk(product_ids)
 
-def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
+        missing_ids = sorted(product_ids - found_products.keys())
+        if missing_ids:
+            message = PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+            raise ValidationError([
+                message.format(pk_value=product_id) for product_id in missing_ids
+            ])
+
+        for item in products:
+            item['product'] = found_products[item['product']]
+        return products
+
+
+def get_banner_list():
+    now = timezone.now()
+    banners = list(
+        Banner.objects
+        .filter(is_active=True)
+        .filter(Q(ends_at__isnull=True) | Q(ends_at__gt=now))
+    )
+    dumped_banners = [
         {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+        for banner in banners
+        if banner.starts_at is None or banner.starts_at <= now
+    ]
+
+    timeout = CACHE_TIMEOUT
+    next_changes = [
+        moment
+        for banner in banners
+        for moment in (banner.starts_at, banner.ends_at)
+        if moment and moment > now
+    ]
+    if next_changes:
+        seconds_left = (min(next_changes) - now).total_seconds()
+        timeout = min(timeout, max(1, math.ceil(seconds_left)))
+    return dumped_banners, timeout
 
 
-def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            },
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
+def banners_list_api(request):
+    payload = cache.get(BANNERS_CACHE_KEY)
+    if payload is None:
+        banners, timeout = get_banner_list()
+        payload = cache_json(BANNERS_CACHE_KEY, banners, timeout)
+    return conditional_json_response(request, payload)
+
+
+def bootstrap_api(request):
+    payload = cache.get(BOOTSTRAP_CACHE_KEY)
+    if payload is None:
+        banners, timeout = get_banner_list()
+        payload = cache_json(BOOTSTRAP_CACHE_KEY, {
+            'products': get_product_list(),
+            'categories': list(ProductCategory.objects.order_by('id').values('id', 'name')),
+            'banners': banners,
+        }, timeout)
+    return conditional_json_response(request, payload)
+
+
+def dump_product(product, fields):
+    dumped_product = {}
+    for field in fields:
+        if field == 'category':
+            dumped_product['category'] = product['category_id'] and {
+                'id': product['category_id'],
+                'name': product['category__name'],
             }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+        elif field == 'image':
+            dumped_product['image'] = PRODUCT_IMAGE_STORAGE.url(product['image'])
+        elif field == 'image_variants':
+            dumped_product['image_variants'] = {
+                width: {
+                    extension: PRODUCT_IMAGE_STORAGE.url(path)
+                    for extension, path in paths.items()
+                }
+                for width, paths in product['image_variants'].get('widths', {}).items()
+            }
+        elif field == 'restaurant':
+            dumped_product['restaurant'] = {
+                'id': product['id'],
+                'name': product['name'],
+            }
+        else:
+            dumped_product[field] = product[field]
+    return dumped_product
+
+
+def get_products_values(fields):
+    columns = {'id'}
+    for field in fields:
+        columns.update(PRODUCT_FIELDS[field])
+    return (
+        Product.objects
+        .available()
+        .order_by('id')
+        .values(*columns)
+    )
+
+
+def get_product_list():
+    return [
+        dump_product(product, PRODUCT_FIELDS)
+        for product in get_products_values(PRODUCT_FIELDS)
+    ]
 
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+def parse_product_list_params(params):
+    requested_fields = params.get('fields')
+    if requested_fields:
+        requested_fields = set(requested_fields.split(','))
+        unknown_fields = requested_fields - PRODUCT_FIELDS.keys()
+        if unknown_fields:
+            raise ValueError(f'Unknown fields: {unknown_fields}')
+        fields = [field for field in PRODUCT_FIELDS if field in requested_fields]
+    else:
+        fields = list(PRODUCT_FIELDS)
 
-    if not found_places:
-        return 0, 0
+    page_size = settings.PRODUCTS_PAGE_SIZE
+    limit = int(params.get('limit', page_size))
+    if not 0 < limit <= page_size:
+        raise ValueError(f'Invalid limit: {limit}')
 
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return  lon, lat
+    after = int(params.get('after', 0))
+    category_id = params.get('category')
+    if category_id is not None:
+        category_id = int(category_id)
+    return fields, limit, after, category_id
+
+
+def product_list_api(request):
+    if not request.GET.keys() & PRODUCT_LIST_PARAMS:
+        return cached_json_response(request, PRODUCTS_CACHE_KEY, get_product_list)
+
+    try:
+        fields, limit, after, category_id = parse_product_list_params(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest('Некорректные параметры запроса')
+
+    products = get_products_values(fields).filter(id__gt=after)
+    if category_id is not None:
+        products = products.filter(category_id=category_id)
+    products = list(products[:limit + 1])
+
+    response = conditional_json_response(request, make_json_payload([
+        dump_product(product, fields) for product in products[:limit]
+    ]))
+    if len(products) > limit:
+        next_params = request.GET.copy()
+        next_params['after'] = products[limit - 1]['id']
+        response['Link'] = f'<{request.path}?{next_params.urlencode()}>; rel="next"'
+    return response
+
+
+def product_search_api(request):
+    try:
+        fields, limit, *_ = parse_product_list_params(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest('Некорректные параметры запроса')
+
+    product_ids = get_product_search_index().search(request.GET.get('q', ''), limit)
+    products = []
+    if product_ids:
+        products = get_products_values(fields).filter(id__in=product_ids)
+
+    return conditional_json_response(request, make_json_payload([
+        dump_product(product, fields) for product in products
+    ]))
 
 
 @transaction.atomic
 @api_view(['POST'])
 def register_order(request):
-    apikey = settings.YANDEX_GEO_API
     order = request.data
     serializer = OrderSerializer(data=order)
-    serializer.is_valid(raise_exception=True)    
-    order = Order.objects.create(
+    serializer.is_valid(raise_exception=True)
+    order = Order(
         firstname = serializer.validated_data['firstname'],
         lastname = serializer.validated_data['lastname'],
         phonenumber = serializer.validated_data['phonenumber'],
         address = serializer.validated_data['address']
     )
-
-    order_lon, order_lat = fetch_coordinates(
-        apikey, serializer.validated_data['address']
-    )
-
-    obj, created = Place.objects.update_or_create(
-        address = serializer.validated_data['address'],
-        defaults={
-            'lng': order_lon,
-            'lat': order_lat
-        }
-    )
-
-    for product in serializer.validated_data['products']:
-        OrderItem.objects.create(
+    order_items = [
+        OrderItem(
             order = order,
             product = product['product'],
             quantity = product['quantity'],
             price = product['product'].price
         )
+        for product in serializer.validated_data['products']
+    ]
+    order.total_price = sum(item.price * item.quantity for item in order_items)
+    order.locate()
+    order.save()
+
+    OrderItem.objects.bulk_create(order_items)
 
     return Response(serializer.data)
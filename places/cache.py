@@ -0,0 +1,95 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Place
+
+NOT_FOUND_CACHE_KEY = 'places:not-found:{}'
+NOT_FOUND_TIMEOUT = timedelta(days=1)
+
+
+def get_not_found_cache_key(address):
+    return NOT_FOUND_CACHE_KEY.format(hashlib.md5(address.encode()).hexdigest())
+
+
+def get_not_found_addresses(addresses):
+    cache_keys = {get_not_found_cache_key(address): address for address in addresses}
+    return {cache_keys[cache_key] for cache_key in cache.get_many(cache_keys)}
+
+
+def remember_not_found_addresses(addresses):
+    cache.set_many(
+        {get_not_found_cache_key(address): True for address in addresses},
+        timeout=NOT_FOUND_TIMEOUT.total_seconds(),
+    )
+
+
+class PlaceCache:
+    def __init__(self):
+        self.places = OrderedDict()
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def is_fresh(self, place):
+        ttl = timedelta(days=settings.PLACE_CACHE_TTL_DAYS)
+        return timezone.now() - place.updated_at < ttl
+
+    def get(self, address, verify=False):
+        with self.lock:
+            place = self.places.get(address)
+            if place and self.is_fresh(place):
+                self.places.move_to_end(address)
+            else:
+                place = None
+
+        if place and (not verify or self.exists(place)):
+            with self.lock:
+                self.counters['memory_hits'] += 1
+            return place
+        if place:
+            self.evict(address)
+
+        place = Place.objects.filter(address=address).first()
+        if place and self.is_fresh(place):
+            self.put(place)
+            counter = 'database_hits'
+        else:
+            counter = 'misses'
+        with self.lock:
+            self.counters[counter] += 1
+        return place
+
+    def put(self, place):
+        with self.lock:
+            self.places[place.address] = place
+            self.places.move_to_end(place.address)
+            while len(self.places) > settings.PLACE_CACHE_SIZE:
+                self.places.popitem(last=False)
+
+    def evict(self, address):
+        with self.lock:
+            self.places.pop(address, None)
+
+    def exists(self, place):
+        # other processes do not see our evictions, so the row may be gone
+        return Place.objects.filter(
+            pk=place.pk,
+            address=place.address,
+            updated_at=place.updated_at,
+        ).exists()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'memory_hits': self.counters['memory_hits'],
+                'database_hits': self.counters['database_hits'],
+                'misses': self.counters['misses'],
+            }
+
+
+place_cache = PlaceCache()
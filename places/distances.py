@@ -0,0 +1,19 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def get_distance_matrix(origins, destinations):
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+
+    origin_lng, origin_lat = origins[:, 0, np.newaxis], origins[:, 1, np.newaxis]
+    destination_lng, destination_lat = destinations[:, 0], destinations[:, 1]
+
+    haversine = (
+        np.sin((destination_lat - origin_lat) / 2) ** 2
+        + np.cos(origin_lat) * np.cos(destination_lat)
+        * np.sin((destination_lng - origin_lng) / 2) ** 2
+    )
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(haversine))
+    return np.round(distances, 2)
@@ -0,0 +1,122 @@
+import hashlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+
+class YandexGeocoder:
+    base_url = 'https://geocode-maps.yandex.ru/1.x'
+    retry_statuses = {429, 500, 502, 503, 504}
+
+    def __init__(self, apikey, timeout=5, retries=3, backoff=0.3, pool_size=10):
+        self.apikey = apikey
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    def request(self, address):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(self.base_url, timeout=self.timeout, params={
+                    'geocode': address,
+                    'apikey': self.apikey,
+                    'format': 'json',
+                })
+                if response.status_code not in self.retry_statuses:
+                    break
+                response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+                if attempt == self.retries:
+                    raise
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_coordinates(self, address):
+        found_places = self.request(address)['response']['GeoObjectCollection']['featureMember']
+        if not found_places:
+            return None
+
+        most_relevant = found_places[0]
+        lng, lat = most_relevant['GeoObject']['Point']['pos'].split(' ')
+        return lng, lat
+
+
+class FakeGeocoder:
+    def __init__(self, places=None, center=(37.62, 55.75), spread=0.2, **options):
+        self.places = places or {}
+        self.center = center
+        self.spread = spread
+
+    def fetch_coordinates(self, address):
+        if address in self.places:
+            return self.places[address]
+
+        digest = hashlib.md5(address.encode()).digest()
+        lng_shift, lat_shift = (
+            (int.from_bytes(digest[start:start + 4], 'big') / 2 ** 32 - 0.5) * self.spread
+            for start in (0, 4)
+        )
+        center_lng, center_lat = self.center
+        return f'{center_lng + lng_shift:.6f}', f'{center_lat + lat_shift:.6f}'
+
+
+@lru_cache(maxsize=None)
+def get_geocoder():
+    backend = import_string(settings.GEOCODER['BACKEND'])
+    return backend(**settings.GEOCODER.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_geocoder(*, setting, **kwargs):
+    if setting == 'GEOCODER':
+        get_geocoder.cache_clear()
+
+
+def fetch_coordinates(address):
+    return get_geocoder().fetch_coordinates(address)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.GEOCODER_MAX_WORKERS,
+        thread_name_prefix='geocoder',
+    )
+
+
+@receiver(setting_changed)
+def reset_executor(*, setting, **kwargs):
+    if setting == 'GEOCODER_MAX_WORKERS':
+        get_executor().shutdown(wait=False, cancel_futures=True)
+        get_executor.cache_clear()
+
+
+def fetch_coordinates_concurrently(addresses, timeout):
+    executor = get_executor()
+    futures = {
+        executor.submit(fetch_coordinates, address): address
+        for address in addresses
+    }
+    done, not_done = wait(futures, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+
+    return {
+        futures[future]: future.result()
+        for future in done
+        if not future.exception()
+    }
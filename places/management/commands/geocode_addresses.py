@@ -0,0 +1,131 @@
+import time
+from datetime import timedelta
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from foodcartapp.candidates import (attach_restaurant_places,
+                                    invalidate_candidates,
+                                    refresh_stale_candidates)
+from foodcartapp.models import Order
+from places.cache import place_cache, remember_not_found_addresses
+from places.geocoder import fetch_coordinates
+from places.models import GeocodingTask, Place
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает очередь адресов, сохраняет их координаты '
+        'и подбирает рестораны для заказов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и завершить работу',
+        )
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument(
+            '--claim-timeout',
+            type=float,
+            default=600,
+            help='Через сколько секунд задачу может взять другой обработчик',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Пауза в секундах, если очередь пуста',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_batch(
+                options['batch_size'],
+                options['max_attempts'],
+                options['claim_timeout'],
+            )
+            processed += refresh_stale_candidates(options['batch_size'])
+            if processed:
+                continue
+            if options['once']:
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Статистика кэша адресов: {place_cache.stats()}')
+                return
+            time.sleep(options['sleep'])
+
+    def process_batch(self, batch_size, max_attempts, claim_timeout):
+        tasks = self.claim_tasks(batch_size, claim_timeout)
+        for task in tasks:
+            self.process_task(task, max_attempts)
+        return len(tasks)
+
+    @transaction.atomic
+    def claim_tasks(self, batch_size, claim_timeout):
+        now = timezone.now()
+        tasks = list(
+            GeocodingTask.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by('created_at')[:batch_size]
+        )
+        GeocodingTask.objects.filter(pk__in=[task.pk for task in tasks]).update(
+            claimed_until=now + timedelta(seconds=claim_timeout)
+        )
+        return tasks
+
+    def process_task(self, task, max_attempts):
+        place = place_cache.get(task.address)
+        if place and place_cache.is_fresh(place):
+            self.finish_task(task, (place.lng, place.lat))
+            return
+
+        try:
+            coordinates = fetch_coordinates(task.address)
+        except requests.RequestException as error:
+            task.attempts += 1
+            if task.attempts < max_attempts:
+                self.stderr.write(f'{task.address}: {error}')
+                GeocodingTask.objects.filter(pk=task.pk).update(
+                    attempts=task.attempts,
+                    created_at=timezone.now(),
+                    claimed_until=None
+                )
+                return
+            coordinates = None
+
+        self.finish_task(task, coordinates)
+
+    @transaction.atomic
+    def finish_task(self, task, coordinates):
+        if coordinates:
+            lng, lat = coordinates
+            place, created = Place.objects.update_or_create(
+                address=task.address,
+                defaults={'lng': lng, 'lat': lat}
+            )
+            place_cache.put(place)
+            if not created:
+                invalidate_candidates(Order.objects.filter(place=place))
+        else:
+            remember_not_found_addresses([task.address])
+
+        # waits for find_place callers that are still saving orders for the task
+        list(GeocodingTask.objects.select_for_update().filter(pk=task.pk))
+        Order.objects.mark_geocoded({task.address: coordinates})
+        if coordinates:
+            attach_restaurant_places([task.address])
+
+        pending_orders = Order.objects.filter(
+            address=task.address,
+            geocoding_status=Order.GEOCODING_PENDING,
+        )
+        if pending_orders.exists():
+            GeocodingTask.objects.filter(pk=task.pk).update(claimed_until=None)
+        else:
+            GeocodingTask.objects.filter(pk=task.pk).delete()
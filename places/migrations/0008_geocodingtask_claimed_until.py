@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0007_geocodingtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodingtask',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Взята в работу до'),
+        ),
+    ]
@@ -33,3 +33,33 @@ class Place(models.Model):
 
     def __str__(self):
         return self.address
+
+
+class GeocodingTask(models.Model):
+    address = models.CharField(
+        'адрес',
+        max_length=100,
+        unique=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Количество попыток',
+        default=0
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Время постановки в очередь',
+        default=timezone.now,
+        db_index=True
+    )
+    claimed_until = models.DateTimeField(
+        verbose_name='Взята в работу до',
+        null=True,
+        blank=True,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Задача геокодирования'
+        verbose_name_plural = 'Задачи геокодирования'
+
+    def __str__(self):
+        return self.address
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import place_cache
+from .models import Place
+
+
+@receiver([post_save, post_delete], sender=Place)
+def evict_cached_place(instance, **kwargs):
+    place_cache.evict(instance.address)
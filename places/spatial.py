@@ -0,0 +1,70 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .distances import get_distance_matrix
+
+KM_PER_DEGREE = 111.195
+
+
+def get_bounding_box(lng, lat, radius_km):
+    lng, lat = float(lng), float(lat)
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = lat_delta / max(math.cos(math.radians(lat)), 0.01)
+    return lng - lng_delta, lat - lat_delta, lng + lng_delta, lat + lat_delta
+
+
+class GridIndex:
+    def __init__(self, points, cell_km=10):
+        self.cell_degrees = cell_km / KM_PER_DEGREE
+        self.ids = [point_id for point_id, _, _ in points]
+        self.coordinates = np.array(
+            [(lng, lat) for _, lng, lat in points], dtype=float
+        ).reshape(-1, 2)
+
+        self.cells = defaultdict(list)
+        for position, (lng, lat) in enumerate(self.coordinates):
+            self.cells[self.get_cell(lng, lat)].append(position)
+        self.cells = dict(self.cells)
+
+    def get_cell(self, lng, lat):
+        return int(lng // self.cell_degrees), int(lat // self.cell_degrees)
+
+    def get_positions_around(self, lng, lat, radius_km):
+        min_lng, min_lat, max_lng, max_lat = get_bounding_box(lng, lat, radius_km)
+        min_column, min_row = self.get_cell(min_lng, min_lat)
+        max_column, max_row = self.get_cell(max_lng, max_lat)
+
+        cells_count = (max_column - min_column + 1) * (max_row - min_row + 1)
+        if cells_count > len(self.cells):
+            cells = (
+                positions for (column, row), positions in self.cells.items()
+                if min_column <= column <= max_column and min_row <= row <= max_row
+            )
+        else:
+            cells = (
+                self.cells.get((column, row), [])
+                for column in range(min_column, max_column + 1)
+                for row in range(min_row, max_row + 1)
+            )
+        return [position for positions in cells for position in positions]
+
+    def find_nearest(self, lng, lat, limit=None, radius_km=None, allowed_ids=None):
+        lng, lat = float(lng), float(lat)
+        if radius_km is None:
+            positions = range(len(self.ids))
+        else:
+            positions = self.get_positions_around(lng, lat, radius_km)
+        if allowed_ids is not None:
+            positions = [position for position in positions if self.ids[position] in allowed_ids]
+        if not positions:
+            return []
+
+        distances = get_distance_matrix([(lng, lat)], self.coordinates[list(positions)])[0]
+        nearest = []
+        for index in np.argsort(distances, kind='stable')[:limit]:
+            if radius_km is not None and distances[index] > radius_km:
+                break
+            nearest.append((self.ids[positions[index]], float(distances[index])))
+        return nearest
@@ -1,3 +1,296 @@
-from django.test import TestCase
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from geopy import distance
+
+from foodcartapp.models import Order
+from .cache import PlaceCache, get_not_found_addresses, place_cache
+from .distances import get_distance_matrix
+from .geocoder import YandexGeocoder, fetch_coordinates_concurrently, get_executor
+from .models import GeocodingTask, Place
+from .spatial import GridIndex
+
+
+@override_settings(GEOCODER={
+    'BACKEND': 'places.geocoder.FakeGeocoder',
+    'OPTIONS': {
+        'places': {'Москва, Тверская 1': ('37.61', '55.76')},
+    },
+})
+class GeocodeAddressesTest(TestCase):
+
+    def setUp(self):
+        place_cache.places.clear()
+
+    def test_queue_is_drained(self):
+        order = Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79001234567',
+            address='Москва, Тверская 1',
+        )
+        GeocodingTask.objects.create(address=order.address)
+
+        call_command('geocode_addresses', once=True)
+
+        place = Place.objects.get(address=order.address)
+        self.assertEqual((str(place.lng), str(place.lat)), ('37.61000000000000', '55.76000000000000'))
+        order.refresh_from_db()
+        self.assertEqual(order.geocoding_status, Order.GEOCODING_RESOLVED)
+        self.assertFalse(GeocodingTask.objects.exists())
+
+    def test_cache_stats_are_printed_only_when_verbose(self):
+        stdout = StringIO()
+        call_command('geocode_addresses', once=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), '')
+
+        call_command('geocode_addresses', once=True, verbosity=2, stdout=stdout)
+        self.assertIn('memory_hits', stdout.getvalue())
+
+    def test_order_saved_during_request_is_resolved(self):
+        def fetch_coordinates(address):
+            Order.objects.create(firstname='Пётр', phonenumber='+79001234568', address=address)
+            return ('37.61', '55.76')
+
+        GeocodingTask.objects.create(address='Москва, Тверская 1')
+        with mock.patch(
+            'places.management.commands.geocode_addresses.fetch_coordinates',
+            fetch_coordinates,
+        ):
+            call_command('geocode_addresses', once=True)
+
+        self.assertEqual(Order.objects.get().geocoding_status, Order.GEOCODING_RESOLVED)
+        self.assertFalse(GeocodingTask.objects.exists())
+
+    def test_claimed_task_is_skipped(self):
+        task = GeocodingTask.objects.create(
+            address='Москва, Тверская 1',
+            claimed_until=timezone.now() + timedelta(minutes=1),
+        )
+
+        call_command('geocode_addresses', once=True)
+        self.assertTrue(GeocodingTask.objects.filter(pk=task.pk).exists())
+
+        GeocodingTask.objects.update(claimed_until=timezone.now() - timedelta(minutes=1))
+        call_command('geocode_addresses', once=True)
+        self.assertFalse(GeocodingTask.objects.exists())
+
+    def test_failed_request_releases_task(self):
+        task = GeocodingTask.objects.create(address='Москва, Тверская 1')
+        with mock.patch(
+            'places.management.commands.geocode_addresses.fetch_coordinates',
+            side_effect=requests.ConnectionError('offline'),
+        ):
+            call_command('geocode_addresses', once=True, max_attempts=2, stderr=StringIO())
+
+        self.assertFalse(GeocodingTask.objects.exists())
+        self.assertFalse(Place.objects.filter(address=task.address).exists())
+
+
+    def test_not_found_address_is_remembered(self):
+        GeocodingTask.objects.create(address='Москва, Несуществующая 1')
+        with mock.patch(
+            'places.management.commands.geocode_addresses.fetch_coordinates',
+            return_value=None,
+        ):
+            call_command('geocode_addresses', once=True)
+
+        self.assertEqual(
+            get_not_found_addresses(['Москва, Несуществующая 1', 'Москва, Тверская 1']),
+            {'Москва, Несуществующая 1'},
+        )
+
+
+class FetchCoordinatesConcurrentlyTest(TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def fetch_coordinates(self, address):
+        if address == 'медленный':
+            self.release.wait(5)
+        if address == 'ошибка':
+            raise requests.ConnectionError('offline')
+        return ('37.61', '55.76')
+
+    def test_returns_partial_results_on_timeout(self):
+        with mock.patch('places.geocoder.fetch_coordinates', self.fetch_coordinates):
+            started_at = time.monotonic()
+            coordinates = fetch_coordinates_concurrently(
+                ['быстрый', 'медленный', 'ошибка'],
+                timeout=0.2,
+            )
+
+        self.assertLess(time.monotonic() - started_at, 2)
+        self.assertEqual(coordinates, {'быстрый': ('37.61', '55.76')})
+
+    @override_settings(GEOCODER_MAX_WORKERS=2)
+    def test_pool_is_shared_between_calls(self):
+        with mock.patch('places.geocoder.fetch_coordinates', self.fetch_coordinates):
+            fetch_coordinates_concurrently(['медленный'] * 2, timeout=0.1)
+            coordinates = fetch_coordinates_concurrently(['быстрый'], timeout=0.1)
+
+            self.assertEqual(coordinates, {})
+            self.assertEqual(get_executor()._max_workers, 2)
+
+            self.release.set()
+            coordinates = fetch_coordinates_concurrently(['быстрый'], timeout=2)
+        self.assertEqual(coordinates, {'быстрый': ('37.61', '55.76')})
+
+
+class YandexGeocoderTest(TestCase):
+
+    def setUp(self):
+        self.geocoder = YandexGeocoder('apikey', retries=2, backoff=0)
+
+    def make_response(self, status_code, found_places=()):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = json.dumps({
+            'response': {'GeoObjectCollection': {'featureMember': list(found_places)}},
+        }).encode()
+        return response
+
+    def fetch_coordinates(self, *responses):
+        with mock.patch.object(self.geocoder.session, 'get', side_effect=responses) as session_get:
+            try:
+                return self.geocoder.fetch_coordinates('Москва, Тверская 1')
+            finally:
+                self.calls_count = session_get.call_count
+
+    def test_retries_unavailable_service(self):
+        found_place = {'GeoObject': {'Point': {'pos': '37.61 55.76'}}}
+
+        coordinates = self.fetch_coordinates(
+            self.make_response(503),
+            self.make_response(503),
+            self.make_response(200, [found_place]),
+        )
+
+        self.assertEqual(coordinates, ('37.61', '55.76'))
+        self.assertEqual(self.calls_count, 3)
+
+    def test_gives_up_after_retries(self):
+        with self.assertRaises(requests.HTTPError):
+            self.fetch_coordinates(*[self.make_response(503) for _ in range(3)])
+        self.assertEqual(self.calls_count, 3)
+
+    def test_client_error_is_not_retried(self):
+        with self.assertRaises(requests.HTTPError):
+            self.fetch_coordinates(self.make_response(404), self.make_response(200))
+        self.assertEqual(self.calls_count, 1)
+
+    def test_retries_timeout(self):
+        coordinates = self.fetch_coordinates(requests.Timeout('slow'), self.make_response(200))
+
+        self.assertIsNone(coordinates)
+        self.assertEqual(self.calls_count, 2)
+
+
+class PlaceCacheTest(TestCase):
+
+    def test_stale_place_is_a_miss(self):
+        place = Place.objects.create(address='Москва, Тверская 1', lng=37.61, lat=55.76)
+        Place.objects.filter(pk=place.pk).update(updated_at=timezone.now() - timedelta(days=365))
+        cache = PlaceCache()
+
+        stale_place = cache.get(place.address)
+
+        self.assertFalse(cache.is_fresh(stale_place))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_fresh_place_is_served_from_memory(self):
+        place = Place.objects.create(address='Москва, Тверская 1', lng=37.61, lat=55.76)
+        cache = PlaceCache()
+
+        cache.get(place.address)
+        with self.assertNumQueries(0):
+            cache.get(place.address)
+
+        self.assertEqual(cache.stats(), {'memory_hits': 1, 'database_hits': 1, 'misses': 0})
+
+    def test_deleted_place_is_evicted(self):
+        self.addCleanup(place_cache.places.clear)
+        place = Place.objects.create(address='Москва, Тверская 1', lng=37.61, lat=55.76)
+        place_cache.get(place.address)
+
+        place.delete()
+
+        self.assertNotIn(place.address, place_cache.places)
+
+    def test_verified_hit_checks_database(self):
+        place = Place.objects.create(address='Москва, Тверская 1', lng=37.61, lat=55.76)
+        cache = PlaceCache()
+        cache.get(place.address)
+        with self.assertNumQueries(1):
+            self.assertEqual(cache.get(place.address, verify=True), place)
+
+        Place.objects.filter(pk=place.pk).delete()
+
+        self.assertIsNone(cache.get(place.address, verify=True))
+        self.assertNotIn(place.address, cache.places)
+        self.assertEqual(cache.stats(), {'memory_hits': 1, 'database_hits': 1, 'misses': 1})
+
+
+class DistanceMatrixTest(TestCase):
+
+    def test_matches_geodesic_distance(self):
+        randomizer = random.Random(42)
+        origins = [
+            (randomizer.uniform(37.3, 37.9), randomizer.uniform(55.5, 56.0))
+            for _ in range(20)
+        ]
+        destinations = [
+            (randomizer.uniform(37.3, 37.9), randomizer.uniform(55.5, 56.0))
+            for _ in range(30)
+        ]
+
+        distances = get_distance_matrix(origins, destinations)
+
+        self.assertEqual(distances.shape, (20, 30))
+        for row, (origin_lng, origin_lat) in enumerate(origins):
+            for column, (destination_lng, destination_lat) in enumerate(destinations):
+                geodesic_km = distance.distance(
+                    (origin_lat, origin_lng), (destination_lat, destination_lng)
+                ).km
+                self.assertAlmostEqual(
+                    distances[row, column], geodesic_km, delta=geodesic_km * 0.005 + 0.01
+                )
+
+    def test_empty_input(self):
+        self.assertEqual(get_distance_matrix([], [(37.6, 55.7)]).shape, (0, 1))
+
+
+class GridIndexTest(TestCase):
+
+    def test_matches_brute_force(self):
+        randomizer = random.Random(42)
+        points = [
+            (point_id, randomizer.uniform(30, 60), randomizer.uniform(45, 60))
+            for point_id in range(300)
+        ]
+        allowed_ids = set(range(0, 300, 3))
+        grid = GridIndex(points)
+
+        for _ in range(50):
+            lng, lat = randomizer.uniform(30, 60), randomizer.uniform(45, 60)
+            nearest = grid.find_nearest(lng, lat, limit=5, radius_km=300, allowed_ids=allowed_ids)
+
+            distances = get_distance_matrix([(lng, lat)], [(point_lng, point_lat) for _, point_lng, point_lat in points])[0]
+            expected = sorted(
+                (distances[point_id], point_id) for point_id in allowed_ids
+                if distances[point_id] <= 300
+            )[:5]
+            self.assertEqual(
+                [point_id for point_id, _ in nearest],
+                [point_id for _, point_id in expected],
+            )
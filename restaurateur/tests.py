@@ -1,3 +1,311 @@
-from django.test import TestCase
+import re
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import unquote
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from foodcartapp.availability import get_availability_index, get_restaurants_grid
+from foodcartapp.models import Order, OrderCandidate, Restaurant, RestaurantMenuItem
+from foodcartapp.testing import create_manager, create_products, create_restaurants
+from places.cache import place_cache
+from places.models import Place
+
+
+class UpdateOrdersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_manager()
+        cls.orders = [
+            Order.objects.create(
+                firstname='Иван',
+                phonenumber='+79001234567',
+                address=f'Москва, Тверская {number}',
+            )
+            for number in range(200)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def post_action(self, action, orders):
+        return self.client.post(reverse('restaurateur:update_orders'), {
+            'action': action,
+            'orders': [order.id for order in orders],
+            'next': reverse('restaurateur:view_orders'),
+        })
+
+    def test_updates_all_selected_orders_at_once(self):
+        updated_before = {order.id: order.updated_at for order in self.orders}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_action('delivered', self.orders)
+
+        self.assertRedirects(response, reverse('restaurateur:view_orders'), fetch_redirect_response=False)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "foodcartapp_order"')]
+        self.assertEqual(len(updates), 1)
+        for order in Order.objects.all():
+            self.assertEqual(order.status, Order.PROCESSED)
+            self.assertIsNotNone(order.called_at)
+            self.assertIsNotNone(order.delivered_at)
+            self.assertGreater(order.updated_at, updated_before[order.id])
+
+    def test_called_keeps_first_call_time(self):
+        self.post_action('called', self.orders[:1])
+        called_at = Order.objects.get(pk=self.orders[0].pk).called_at
+
+        self.post_action('called', self.orders[:2])
+
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).called_at, called_at)
+        self.assertIsNotNone(Order.objects.get(pk=self.orders[1].pk).called_at)
+        self.assertEqual(Order.objects.filter(status=Order.PROCESSED).count(), 0)
+
+    def test_unknown_action_is_rejected(self):
+        response = self.post_action('cancelled', self.orders[:1])
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ViewProductsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_manager()
+        cls.restaurants = create_restaurants()
+        cls.products = create_products(60)
+        RestaurantMenuItem.objects.create(restaurant=cls.restaurants[0], product=cls.products[0])
+        RestaurantMenuItem.objects.create(
+            restaurant=cls.restaurants[2],
+            product=cls.products[0],
+            availability=False,
+        )
+        RestaurantMenuItem.objects.create(restaurant=cls.restaurants[1], product=cls.products[59])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.manager)
+
+    def get_rows(self, page=1):
+        response = self.client.get(reverse('restaurateur:ProductsView'), {'page': page})
+        self.assertEqual(response.status_code, 200)
+        return {
+            product.id: cells.count('menu-available"')
+            for product, _, cells in response.context['products_with_restaurants']
+        }
+
+    def test_matrix_is_paged(self):
+        first_page = self.get_rows()
+        self.assertEqual(len(first_page), 50)
+        self.assertEqual(first_page[self.products[0].id], 1)
+        self.assertEqual(sum(first_page.values()), 1)
+
+        last_page = self.get_rows(page=2)
+        self.assertEqual(len(last_page), 10)
+        self.assertEqual(last_page[self.products[59].id], 1)
+
+    def test_menu_changes_reset_cached_matrix(self):
+        self.get_rows()
+        with self.assertNumQueries(6):
+            self.get_rows()
+
+        RestaurantMenuItem.objects.filter(product=self.products[0]).update(availability=True)
+
+        first_page = self.get_rows()
+        self.assertEqual(first_page[self.products[0].id], 2)
+
+
+@override_settings(
+    ORDERS_PAGE_SIZE=4,
+    GEOCODER={'BACKEND': 'places.geocoder.FakeGeocoder'},
+)
+class ViewOrdersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_manager()
+        Place.objects.create(address='Москва, Арбат 1', lng=37.59, lat=55.75)
+        cls.restaurant, = create_restaurants(1)
+        place = Place.objects.create(address='Москва, Тверская 0', lng=37.61, lat=55.76)
+        cls.orders = [
+            Order.objects.create(
+                firstname='Иван',
+                phonenumber='+79001234567',
+                address=f'Москва, Тверская {number}',
+                geocoding_status=Order.GEOCODING_RESOLVED,
+                place=place,
+                candidates_computed=True,
+            )
+            for number in range(6)
+        ]
+        OrderCandidate.objects.create(order=cls.orders[0], restaurant=cls.restaurant, distance=1.5)
+        Order.objects.create(
+            firstname='Пётр',
+            phonenumber='+79001234568',
+            address='Москва, Тверская 1',
+            status=Order.PROCESSED,
+        )
+
+    def setUp(self):
+        self.addCleanup(place_cache.places.clear)
+        self.client.force_login(self.manager)
+
+    def get_page(self, query=None):
+        response = self.client.get(reverse('restaurateur:view_orders'), query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        order_ids = [int(order_id) for order_id in re.findall(r'data-order-id="(\d+)"', content)]
+        next_cursor = re.search(r'class="next"><a href="[^"?]*\?after=([^"]+)"', content)
+        return content, order_ids, next_cursor and next_cursor.group(1)
+
+    def test_first_page_is_streamed(self):
+        content, order_ids, next_cursor = self.get_page()
+
+        self.assertEqual(order_ids, [order.id for order in self.orders[:4]])
+        self.assertIsNotNone(next_cursor)
+        self.assertIn('Star Burger Арбат - 1,5 км', content)
+        self.assertTrue(content.rstrip().endswith('</html>'))
+
+    def test_next_cursor_continues_after_page(self):
+        _, _, next_cursor = self.get_page()
+
+        _, order_ids, last_cursor = self.get_page({'after': unquote(next_cursor)})
+
+        self.assertEqual(order_ids, [order.id for order in self.orders[4:]])
+        self.assertIsNone(last_cursor)
+
+    def test_shared_indexes_are_read_once_per_page(self):
+        Order.objects.update(candidates_computed=False)
+
+        with mock.patch('restaurateur.views.get_availability_index', wraps=get_availability_index) as get_index, \
+                mock.patch('restaurateur.views.get_restaurants_grid', wraps=get_restaurants_grid) as get_grid:
+            _, order_ids, _ = self.get_page()
+
+        self.assertEqual(len(order_ids), 4)
+        get_index.assert_called_once_with()
+        get_grid.assert_called_once_with()
+
+    def test_unknown_restaurant_address_is_requested_once(self):
+        Restaurant.objects.create(name='Star Burger Нигде', address='Москва, Несуществующая 1')
+
+        with mock.patch('restaurateur.views.fetch_coordinates_concurrently') as fetch_coordinates:
+            fetch_coordinates.return_value = {'Москва, Несуществующая 1': None}
+            self.get_page()
+            self.get_page()
+
+        fetch_coordinates.assert_called_once()
+        self.assertIn('Москва, Несуществующая 1', fetch_coordinates.call_args[0][0])
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ['abc', 'abc_1', '2021-10-01T00:00:00+00:00_x']:
+            response = self.client.get(reverse('restaurateur:view_orders'), {'after': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class OrderChangesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_manager()
+        cls.orders = [
+            Order.objects.create(
+                firstname='Иван',
+                phonenumber='+79001234567',
+                address=f'Москва, Тверская {number}',
+                geocoding_status=Order.GEOCODING_FAILED,
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def get_changes(self, since):
+        response = self.client.get(reverse('restaurateur:order_changes'), {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def make_cursor(self, order):
+        order.refresh_from_db()
+        return f'{order.updated_at.isoformat()}_{order.id}'
+
+    def test_returns_changes_after_cursor(self):
+        cursor = self.make_cursor(self.orders[-1])
+        self.assertEqual(self.get_changes(cursor)['cursor'], cursor)
+
+        Order.objects.filter(pk=self.orders[0].pk).mark_processed()
+        Order.objects.filter(pk=self.orders[1].pk).mark_called()
+        changes = self.get_changes(cursor)
+
+        self.assertEqual(changes['cursor'], self.make_cursor(self.orders[1]))
+        changed_orders = {order['id']: order for order in changes['orders']}
+        self.assertIsNone(changed_orders[self.orders[0].id]['html'])
+        self.assertIn(f'data-order-id="{self.orders[1].id}"', changed_orders[self.orders[1].id]['html'])
+        self.assertFalse(changes['has_more'])
+
+    def test_late_commit_inside_overlap_is_returned(self):
+        cursor_order = self.orders[-1]
+        cursor = self.make_cursor(cursor_order)
+        Order.objects.filter(pk=self.orders[0].pk).update(
+            updated_at=cursor_order.updated_at - timedelta(seconds=5)
+        )
+        Order.objects.filter(pk=self.orders[1].pk).update(
+            updated_at=cursor_order.updated_at - timedelta(minutes=5)
+        )
+
+        changes = self.get_changes(cursor)
+
+        changed_orders = {order['id']: order for order in changes['orders']}
+        self.assertIn(self.orders[0].id, changed_orders)
+        self.assertNotIn('html', changed_orders[self.orders[0].id])
+        self.assertNotIn(self.orders[1].id, changed_orders)
+        self.assertEqual(changes['cursor'], cursor)
+
+    @override_settings(ORDERS_PAGE_SIZE=1)
+    def test_overlap_keeps_orders_nearest_to_cursor(self):
+        cursor_order = self.orders[-1]
+        cursor = self.make_cursor(cursor_order)
+        for order, seconds in [(self.orders[0], 20), (self.orders[1], 5)]:
+            Order.objects.filter(pk=order.pk).update(
+                updated_at=cursor_order.updated_at - timedelta(seconds=seconds)
+            )
+
+        changes = self.get_changes(cursor)
+
+        self.assertEqual([order['id'] for order in changes['orders']], [cursor_order.id])
+
+        Order.objects.filter(pk=cursor_order.pk).update(
+            updated_at=cursor_order.updated_at - timedelta(minutes=5)
+        )
+        changes = self.get_changes(cursor)
+
+        self.assertEqual([order['id'] for order in changes['orders']], [self.orders[1].id])
+
+    def test_rows_are_rendered_by_id(self):
+        Order.objects.filter(pk=self.orders[0].pk).mark_processed()
+
+        response = self.client.get(reverse('restaurateur:order_rows'), {
+            'ids': [self.orders[0].id, self.orders[1].id],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        changed_orders = {order['id']: order for order in response.json()['orders']}
+        self.assertIsNone(changed_orders[self.orders[0].id]['html'])
+        self.assertIn(
+            f'data-version="{self.make_cursor(self.orders[1])}"',
+            changed_orders[self.orders[1].id]['html'],
+        )
+        self.assertEqual(
+            self.client.get(reverse('restaurateur:order_rows'), {'ids': 'x'}).status_code,
+            400,
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+        for query in [{}, {'since': 'abc'}, {'since': '2021-10-01T00:00:00+00:00_x'}]:
+            response = self.client.get(reverse('restaurateur:order_changes'), query)
+            self.assertEqual(response.status_code, 400, query)
@@ -1,20 +1,51 @@
-import requests
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain, islice
+
 from django import forms
 from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Prefetch
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
 from django.db.models.expressions import OuterRef, Subquery
+from django.http import (HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import redirect, render
-from django.urls import reverse_lazy
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.dateparse import parse_datetime
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.safestring import mark_safe
 from django.views import View
+from django.views.decorators.http import require_POST
 from dotenv import load_dotenv
-from geopy import distance
 
-from foodcartapp.models import (Order, OrderItem, Product, Restaurant,
-                                RestaurantMenuItem)
-from places.models import Place
+from foodcartapp.availability import get_availability_index, get_restaurants_grid
+from foodcartapp.candidates import (attach_restaurant_places, find_candidates,
+                                    get_order_product_ids)
+from foodcartapp.models import (Order, OrderCandidate, OrderItem, Product,
+                                Restaurant)
+from places.cache import (get_not_found_addresses, place_cache,
+                          remember_not_found_addresses)
+from places.geocoder import fetch_coordinates_concurrently
+from places.models import GeocodingTask, Place
+
+ORDERS_CHUNK_SIZE = 50
+MENU_PAGE_SIZE = 50
+MENU_CELLS = {
+    True: '<td class="menu-available"></td>',
+    False: '<td class="menu-unavailable"></td>',
+}
+ORDER_BULK_ACTIONS = {
+    'called': 'mark_called',
+    'delivered': 'mark_delivered',
+    'processed': 'mark_processed',
+}
+ORDER_CHANGES_OVERLAP = timedelta(seconds=30)
+ORDER_ROWS_PLACEHOLDER = '<!-- order rows -->'
 
 
 class Login(forms.Form):
@@ -71,26 +102,27 @@ def is_manager(user):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-
-    default_availability = {restaurant.id: False for restaurant in restaurants}
-    products_with_restaurants = []
-    for product in products:
-
-        availability = {
-            **default_availability,
-            **{item.restaurant_id: item.availability for item in product.menu_items.all()},
-        }
-        orderer_availability = [availability[restaurant.id] for restaurant in restaurants]
+    restaurants = list(Restaurant.objects.order_by('name').only('id', 'name'))
+    products = Product.objects.select_related('category').order_by('name', 'id')
+    page = Paginator(products, MENU_PAGE_SIZE).get_page(request.GET.get('page'))
 
-        products_with_restaurants.append(
-            (product, orderer_availability)
+    matrix = get_availability_index().get_matrix(
+        [product.id for product in page],
+        [restaurant.id for restaurant in restaurants],
+    )
+    products_with_restaurants = [
+        (
+            product,
+            product.get_image_variant_url(100),
+            mark_safe(''.join(MENU_CELLS[available] for available in availability)),
         )
+        for product, availability in zip(page, matrix)
+    ]
 
     return render(request, template_name="products_list.html", context={
         'products_with_restaurants': products_with_restaurants,
         'restaurants': restaurants,
+        'page': page,
     })
 
 
@@ -101,54 +133,17 @@ def view_restaurants(request):
     })
 
 
-def find_coordinates(base_url, address, apikey):
-    response = requests.get(base_url, params={
-            "geocode": address,
-            "apikey": apikey,
-            "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
-    if not found_places:
-        address_with_coords = {
-            'address': address,
-            'lng': None,
-            'lat': None
-        }
-    else:
-        most_relevant = found_places[0]
-        lng, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-        address_with_coords = {
-            'address': address,
-            'lng': lng,
-            'lat': lat
-        }
-    return address_with_coords
-
+def get_order_details(order, restaurant_distances):
 
-def fetch_coordinates(apikey, addresses):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-
-    addresses_with_coords = [find_coordinates(base_url, address, apikey)
-        for address in addresses
+    rest_distance = [
+        {'name': restaurant.name, 'distance': distance}
+        for restaurant, distance in restaurant_distances
     ]
-    return addresses_with_coords
-
-
-def get_order_details(order, restaurants):
-
-    rest_distance = []
-    for rest in restaurants:
-        rest_distance.append({
-            'name': rest.restaurant.name,
-            'distance': round(distance.distance(
-                (order.lng, order.lat), (rest.lng, rest.lat)
-            ).km, 2),
-        })
     rest_distance = sorted(rest_distance, key=lambda k: k['distance'])
     
     return {
         'id': order.id,
+        'version': make_orders_cursor(order.updated_at, order.id),
         'status': order.get_status_display(),
         'total_price': order.total_price,
         'firstname': order.firstname,
@@ -157,18 +152,127 @@ def get_order_details(order, restaurants):
         'phonenumber': order.phonenumber,
         'comment': order.comment,
         'payment': order.get_payment_display(),
+        'is_geocoded': order.geocoding_status == Order.GEOCODING_RESOLVED,
+        'geocoding_status': order.get_geocoding_status_display(),
         'restaurant': rest_distance
     }
 
 
-def find_restaurants(order, rests_menu):
-    
-    rests_for_products = []
-    for order_item in order.order_items.all():
-        rests_for_product = [rest for rest in rests_menu if rest.product==order_item.product]
-        rests_for_products.append(set(rests_for_product))
-    appropriate_rests = set.intersection(*rests_for_products)
-    return appropriate_rests
+def geocode_missing_addresses(order_addresses):
+    addresses = set(
+        Restaurant.objects
+        .filter(place__isnull=True)
+        .exclude(address='')
+        .values_list('address', flat=True)
+    )
+    addresses.update(order_addresses)
+    exist_addresses = (
+        Place.objects
+        .filter(address__in=addresses)
+        .values_list('address', flat=True)
+    )
+    addresses_to_add = addresses - set(exist_addresses)
+    addresses_to_add -= get_not_found_addresses(addresses_to_add)
+    if not addresses_to_add:
+        return
+
+    addresses_with_coords = fetch_coordinates_concurrently(
+        addresses_to_add,
+        timeout=settings.GEOCODER_PAGE_TIMEOUT,
+    )
+    remember_not_found_addresses(
+        address for address, coordinates in addresses_with_coords.items()
+        if not coordinates
+    )
+    Place.objects.bulk_create([
+        Place(address=address, lng=coordinates[0], lat=coordinates[1])
+        for address, coordinates in addresses_with_coords.items()
+        if coordinates
+    ], ignore_conflicts=True)
+    with transaction.atomic():
+        tasks = GeocodingTask.objects.filter(address__in=addresses_with_coords)
+        list(tasks.select_for_update())
+        Order.objects.mark_geocoded(addresses_with_coords)
+        attach_restaurant_places(addresses_with_coords)
+        tasks.delete()
+
+
+def make_orders_cursor(created_at, order_id):
+    return f'{created_at.isoformat()}_{order_id}'
+
+
+def parse_orders_cursor(cursor):
+    created_at, order_id = cursor.rsplit('_', 1)
+    created_at = parse_datetime(created_at)
+    if not created_at:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return created_at, int(order_id)
+
+
+def render_order_rows(request, orders):
+    row_template = get_template('order_item_row.html')
+    dashboard_url = reverse('restaurateur:view_orders')
+
+    index = grid = None
+    orders = iter(orders)
+    while True:
+        orders_chunk = list(islice(orders, ORDERS_CHUNK_SIZE))
+        if not orders_chunk:
+            return
+
+        order_distances = defaultdict(list)
+        candidates = (
+            OrderCandidate.objects
+            .filter(order__in=[order for order in orders_chunk if order.candidates_computed])
+            .values_list('order_id', 'restaurant_id', 'distance')
+        )
+        for order_id, restaurant_id, distance in candidates:
+            order_distances[order_id].append((restaurant_id, float(distance)))
+
+        orders_to_compute = [order for order in orders_chunk if not order.candidates_computed]
+        if orders_to_compute:
+            if index is None:
+                index = get_availability_index()
+                grid = get_restaurants_grid()
+            order_product_ids = get_order_product_ids(orders_to_compute)
+            for order in orders_to_compute:
+                order_distances[order.id] = find_candidates(
+                    order, order_product_ids[order.id], index=index, grid=grid
+                )
+
+        restaurants = Restaurant.objects.in_bulk({
+            restaurant_id
+            for distances in order_distances.values()
+            for restaurant_id, _ in distances
+        })
+        order_restaurants = {
+            order_id: [
+                (restaurants[restaurant_id], distance)
+                for restaurant_id, distance in distances
+                if restaurant_id in restaurants
+            ]
+            for order_id, distances in order_distances.items()
+        }
+
+        yield [
+            (order, row_template.render({
+                'item': get_order_details(order, order_restaurants.get(order.id, [])),
+                'dashboard_url': dashboard_url,
+            }, request))
+            for order in orders_chunk
+        ]
+
+
+def get_last_change_cursor():
+    last_change = (
+        Order.objects
+        .order_by('-updated_at', '-id')
+        .values_list('updated_at', 'id')
+        .first()
+    )
+    if not last_change:
+        return ''
+    return make_orders_cursor(*last_change)
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
@@ -176,39 +280,142 @@ def view_orders(request):
 
     orders = (
         Order.objects
-        .get_total_price()
-        .fetch_coordinates()
-        .prefetch_related(Prefetch('order_items__product'))
-        .filter(status='not_processed')
+        .filter(status=Order.NOT_PROCESSED)
+        .order_by('created_at', 'id')
     )
-    
-    apikey = settings.YANDEX_GEO_API
-
-    addresses = [order.address for order in orders]
-
-    addresses.extend(Restaurant.objects.values_list('address', flat=True))
-    exist_addresses = Place.objects.values_list('address', flat=True)
-    addresses_to_add = set(addresses) - set(exist_addresses)
-
-    if addresses_to_add:
-        addresses_with_coords = fetch_coordinates(apikey, addresses_to_add)
-        Place.objects.bulk_create([
-            Place(address=place['address'], lng=place['lng'], lat=place['lat'])
-            for place in addresses_with_coords
-        ])
-
-    rests_menu = (
-        RestaurantMenuItem.objects
-        .select_related('restaurant')
-        .select_related('product')
-        .fetch_coordinates()
-        .filter(availability=True)
+    cursor = request.GET.get('after')
+    if cursor:
+        try:
+            created_at, order_id = parse_orders_cursor(cursor)
+        except ValueError:
+            return HttpResponseBadRequest('Некорректный курсор')
+        orders = orders.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=order_id)
+        )
+
+    page_size = settings.ORDERS_PAGE_SIZE
+    page_keys = list(
+        orders.values_list('created_at', 'id', 'address', 'geocoding_status')[:page_size + 1]
     )
+    next_cursor = None
+    if len(page_keys) > page_size:
+        created_at, order_id, *_ = page_keys[page_size - 1]
+        next_cursor = make_orders_cursor(created_at, order_id)
+
+    geocode_missing_addresses({
+        address for *_, address, geocoding_status in page_keys[:page_size]
+        if geocoding_status == Order.GEOCODING_PENDING
+    })
 
-    return render(request, template_name='order_items.html', context={
-        'order_items': [
-            get_order_details( 
-                order, find_restaurants(order, rests_menu)
-            ) for order in orders 
-        ]
+    page = render_to_string('order_items.html', context={
+        'order_rows': mark_safe(ORDER_ROWS_PLACEHOLDER),
+        'cursor': cursor,
+        'next_cursor': next_cursor,
+        'changes_cursor': get_last_change_cursor(),
+        'place_cache_stats': place_cache.stats(),
+    }, request=request)
+    page_head, page_tail = page.split(ORDER_ROWS_PLACEHOLDER)
+
+    page_orders = orders.select_related('place')[:page_size]
+    rows = (
+        ''.join(row for _, row in rows_chunk)
+        for rows_chunk in render_order_rows(
+            request, page_orders.iterator(chunk_size=ORDERS_CHUNK_SIZE)
+        )
+    )
+    return StreamingHttpResponse(chain([page_head], rows, [page_tail]))
+
+
+def serialize_order_changes(request, orders, with_html=True):
+    rows = {}
+    if with_html:
+        unprocessed_orders = [order for order in orders if order.status == Order.NOT_PROCESSED]
+        rows = {
+            order.id: row
+            for rows_chunk in render_order_rows(request, unprocessed_orders)
+            for order, row in rows_chunk
+        }
+
+    changes = []
+    for order in orders:
+        change = {
+            'id': order.id,
+            'version': make_orders_cursor(order.updated_at, order.id),
+        }
+        if with_html:
+            change['html'] = rows.get(order.id)
+        changes.append(change)
+    return changes
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_order_changes(request):
+    try:
+        updated_at, order_id = parse_orders_cursor(request.GET['since'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('Некорректный курсор')
+
+    page_size = settings.ORDERS_PAGE_SIZE
+    orders = Order.objects.order_by('updated_at', 'id').select_related('place')
+    new_orders = list(
+        orders.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=order_id))
+        [:page_size]
+    )
+    # the rows nearest to the cursor are the likeliest late commits, so keep them
+    recent_orders = list(
+        Order.objects
+        .filter(updated_at__gt=updated_at - ORDER_CHANGES_OVERLAP)
+        .filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lte=order_id))
+        .order_by('-updated_at', '-id')
+        .only('id', 'updated_at')[:page_size]
+    )
+
+    cursor = request.GET['since']
+    if new_orders:
+        last_order = new_orders[-1]
+        cursor = make_orders_cursor(last_order.updated_at, last_order.id)
+
+    return JsonResponse({
+        'cursor': cursor,
+        'has_more': len(new_orders) == page_size,
+        'orders': [
+            *serialize_order_changes(request, recent_orders[::-1], with_html=False),
+            *serialize_order_changes(request, new_orders),
+        ],
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_order_rows(request):
+    try:
+        order_ids = [int(order_id) for order_id in request.GET.getlist('ids')]
+    except ValueError:
+        return HttpResponseBadRequest('Некорректный список заказов')
+
+    orders = (
+        Order.objects
+        .filter(pk__in=order_ids[:settings.ORDERS_PAGE_SIZE])
+        .order_by('updated_at', 'id')
+        .select_related('place')
+    )
+    return JsonResponse({
+        'orders': serialize_order_changes(request, orders),
     })
+
+
+@require_POST
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def update_orders(request):
+    try:
+        action = ORDER_BULK_ACTIONS[request.POST['action']]
+        order_ids = [int(order_id) for order_id in request.POST.getlist('orders')]
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('Некорректное действие')
+
+    if order_ids:
+        getattr(Order.objects.filter(pk__in=order_ids), action)()
+
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, settings.ALLOWED_HOSTS):
+        next_url = reverse('restaurateur:view_orders')
+    return redirect(next_url)
@@ -10,6 +10,27 @@ env.read_env()
 
 YANDEX_GEO_API = env('YANDEX_GEO_API')
 
+GEOCODER = {
+    'BACKEND': env.str('GEOCODER_BACKEND', 'places.geocoder.YandexGeocoder'),
+    'OPTIONS': {
+        'apikey': YANDEX_GEO_API,
+        'timeout': env.float('GEOCODER_TIMEOUT', 5),
+        'retries': env.int('GEOCODER_RETRIES', 3),
+        'pool_size': env.int('GEOCODER_MAX_WORKERS', 10),
+    },
+}
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 10)
+GEOCODER_PAGE_TIMEOUT = env.float('GEOCODER_PAGE_TIMEOUT', 2)
+
+ORDERS_PAGE_SIZE = env.int('ORDERS_PAGE_SIZE', 200)
+PRODUCTS_PAGE_SIZE = env.int('PRODUCTS_PAGE_SIZE', 100)
+
+NEAREST_RESTAURANTS_LIMIT = env.int('NEAREST_RESTAURANTS_LIMIT', 10)
+NEAREST_RESTAURANTS_RADIUS_KM = env.float('NEAREST_RESTAURANTS_RADIUS_KM', 50)
+
+PLACE_CACHE_SIZE = env.int('PLACE_CACHE_SIZE', 10000)
+PLACE_CACHE_TTL_DAYS = env.int('PLACE_CACHE_TTL_DAYS', 30)
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -94,12 +115,18 @@ WSGI_APPLICATION = 'star_burger.wsgi.application'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+TEST_RUNNER = 'star_burger.test_runner.TempMediaTestRunner'
+
 DATABASES = {
     'default': dj_database_url.config(
         default=env('DATABASE_URL')
     )
 }
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'db://django_cache'),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',